@@ -0,0 +1,124 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import permissions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import Role, User
+
+TOKEN_VERSION_KEY = 'token-version:{}'
+VERSION_CLAIM = 'token_version'
+# поля пользователя, которые копируются в токен
+CLAIM_FIELDS = ('username', 'role', 'is_superuser')
+# изменение этих полей отзывает уже выданные токены
+REVOKING_FIELDS = ('role', 'is_superuser', 'is_active')
+
+
+def get_token_version(user_id):
+    """Текущая версия токенов пользователя. Берется из кеша,
+    при промахе - из БД. None, если пользователя нет"""
+    key = TOKEN_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = User.objects.filter(pk=user_id).values_list(
+            'token_version', flat=True).first()
+        if version is not None:
+            cache.set(key, version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def set_token_version(user_id, version):
+    cache.set(TOKEN_VERSION_KEY.format(user_id), version,
+              settings.TOKEN_VERSION_CACHE_TIMEOUT)
+
+
+def forget_token_version(user_id):
+    cache.delete(TOKEN_VERSION_KEY.format(user_id))
+
+
+# Кеш ролей в памяти процесса: pk -> (истекает, claims)
+_user_claims = {}
+USER_CLAIMS_CACHE_SIZE = 10000
+
+
+def get_user_claims(user_id):
+    """Имя и роль активного пользователя по pk. Кешируются в процессе
+    на USER_ROLE_CACHE_TIMEOUT секунд. None, если пользователя нет"""
+    now = time.monotonic()
+    cached = _user_claims.get(user_id)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    claims = User.objects.filter(pk=user_id, is_active=True).values(
+        *CLAIM_FIELDS).first()
+    if claims is not None:
+        if len(_user_claims) >= USER_CLAIMS_CACHE_SIZE:
+            _user_claims.clear()
+        _user_claims[user_id] = (now + settings.USER_ROLE_CACHE_TIMEOUT,
+                                 claims)
+    return claims
+
+
+def forget_user_claims(user_id):
+    _user_claims.pop(user_id, None)
+
+
+class ClaimsAccessToken(AccessToken):
+    """Access-токен с ролью пользователя в подписанных claims"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for field in CLAIM_FIELDS:
+            token[field] = getattr(user, field)
+        token[VERSION_CLAIM] = user.token_version
+        return token
+
+
+class ClaimsUser(TokenUser):
+    """Пользователь, восстановленный из claims токена без запроса к БД"""
+
+    @property
+    def role(self):
+        return self.token['role']
+
+    @property
+    def is_admin(self):
+        return self.role == Role.admin.name
+
+    @property
+    def is_moderator(self):
+        return self.role == Role.moderator.name
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """Для запросов на чтение пользователь берется из claims токена,
+    для записи - из БД, так как его сохраняют как автора записей.
+    У токенов без claims (выданных раньше) роль на чтение берется
+    из кеша ролей процесса.
+    Токен отклоняется, если его версия отстала от версии пользователя:
+    она растет при смене роли и блокировке"""
+
+    def authenticate(self, request):
+        self.safe_request = request.method in permissions.SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if VERSION_CLAIM in validated_token and validated_token[
+                VERSION_CLAIM] != get_token_version(user_id):
+            raise AuthenticationFailed('Токен отозван',
+                                       code='token_revoked')
+        if not self.safe_request or user_id is None:
+            return super().get_user(validated_token)
+        if VERSION_CLAIM in validated_token:
+            return ClaimsUser(validated_token)
+        claims = get_user_claims(user_id)
+        if claims is None:
+            raise AuthenticationFailed('Пользователь не найден',
+                                       code='user_not_found')
+        return ClaimsUser({api_settings.USER_ID_CLAIM: user_id, **claims})
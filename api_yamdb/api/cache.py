@@ -0,0 +1,140 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+
+TABLE_VERSION_KEY = 'table-version:{}'
+TABLE_MODIFIED_KEY = 'table-modified:{}'
+OBJECT_VERSION_KEY = 'object-version:{}:{}'
+CACHE_STATS_KEY = 'cache-stats:{}:{}'
+
+
+def _initial_version():
+    # Версия, начатая с текущего времени, не повторит уже выданную,
+    # даже если ключ был вытеснен из кеша
+    return time.time_ns()
+
+
+def get_table_versions(*models):
+    """Возвращаем текущие версии таблиц моделей.
+    Версия меняется при каждой записи в таблицу"""
+    keys = [TABLE_VERSION_KEY.format(model._meta.label_lower)
+            for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def get_table_modified(*models):
+    """Возвращаем время последней записи в таблицы моделей (timestamp).
+    Если время неизвестно (кеш сброшен), считаем, что запись была сейчас"""
+    keys = [TABLE_MODIFIED_KEY.format(model._meta.label_lower)
+            for model in models]
+    modified = cache.get_many(keys)
+    for key in keys:
+        if key not in modified:
+            cache.add(key, time.time(), timeout=None)
+            modified[key] = cache.get(key)
+    return max(modified.values())
+
+
+def bump_table_version(*models):
+    """Сдвигаем версии таблиц, сбрасывая все закешированные по ним данные"""
+    for model in models:
+        key = TABLE_VERSION_KEY.format(model._meta.label_lower)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), timeout=None)
+        cache.set(TABLE_MODIFIED_KEY.format(model._meta.label_lower),
+                  time.time(), timeout=None)
+
+
+def get_versioned_key(prefix, models, *parts):
+    """Ключ кеша по частям запроса и версиям таблиц моделей.
+    Любая запись в эти таблицы меняет ключ, старые записи кеша
+    просто перестают читаться и вытесняются по таймауту"""
+    digest = hashlib.md5(
+        repr((parts, get_table_versions(*models))).encode()).hexdigest()
+    return f'{prefix}:{digest}'
+
+
+def get_object_version(model, pk):
+    """Версия отдельного объекта: меняется при записи в сам объект
+    и в связанные с ним данные, см. api.signals"""
+    key = OBJECT_VERSION_KEY.format(model._meta.label_lower, pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_object_version(model, *pks):
+    for pk in pks:
+        key = OBJECT_VERSION_KEY.format(model._meta.label_lower, pk)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), timeout=None)
+
+
+def count_cache_access(name, hit):
+    key = CACHE_STATS_KEY.format(name, 'hits' if hit else 'misses')
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def get_cache_stats(name):
+    """Счетчики попаданий и промахов кеша с момента сброса"""
+    hits_key = CACHE_STATS_KEY.format(name, 'hits')
+    misses_key = CACHE_STATS_KEY.format(name, 'misses')
+    stats = cache.get_many([hits_key, misses_key])
+    return stats.get(hits_key, 0), stats.get(misses_key, 0)
+
+
+def reset_cache_stats(name):
+    cache.delete_many([CACHE_STATS_KEY.format(name, 'hits'),
+                       CACHE_STATS_KEY.format(name, 'misses')])
+
+
+def get_or_compute(key, compute, timeout, stale_key=None, stale_timeout=None,
+                   lock_timeout=10, wait=2.0, poll_interval=0.05):
+    """Читаем значение из кеша, при промахе считаем его compute().
+    Одновременно одно значение считает только один обработчик
+    (блокировка через cache.add), остальные ждут его результата
+    не дольше wait секунд, а потом считают сами. С stale_key во время
+    пересчета ожидающим сразу отдается предыдущее значение.
+    compute() возвращает None для значений, которые не кешируются.
+    Между процессами работает только с общим кешем (redis, memcached)"""
+    value = cache.get(key)
+    if value is not None:
+        return value
+    lock_key = f'lock:{key}'
+    if cache.add(lock_key, 1, lock_timeout):
+        try:
+            value = compute()
+            if value is not None:
+                cache.set(key, value, timeout)
+                if stale_key is not None:
+                    cache.set(stale_key, value, stale_timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+    if stale_key is not None:
+        value = cache.get(stale_key)
+        if value is not None:
+            return value
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(poll_interval)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return compute()
@@ -1,18 +1,51 @@
 from django_filters import rest_framework
 
-from reviews.models import Title
+from reviews.models import Category, Genre, GenreTitle, Title
+from reviews.search import get_search_backend
+
+
+def split_slugs(value):
+    return [slug for slug in (part.strip() for part in value.split(','))
+            if slug]
 
 
 class TitleFilter(rest_framework.FilterSet):
-    genre = rest_framework.CharFilter(
-        field_name='genre__slug', lookup_expr='icontains')
-    category = rest_framework.CharFilter(
+    """Фильтры произведений.
+    genre и category принимают точный slug или несколько через запятую
+    (?genre=drama,comedy), поиск подстрокой в slug - только через
+    genre_contains и category_contains"""
+    genre = rest_framework.CharFilter(method='filter_genre')
+    category = rest_framework.CharFilter(method='filter_category')
+    genre_contains = rest_framework.CharFilter(
+        field_name='genre__slug', lookup_expr='icontains', distinct=True)
+    category_contains = rest_framework.CharFilter(
         field_name='category__slug', lookup_expr='icontains')
     name = rest_framework.CharFilter(
         field_name='name', lookup_expr='contains')
     year = rest_framework.NumberFilter(
         field_name='year', lookup_expr='exact')
+    q = rest_framework.CharFilter(method='search')
 
     class Meta:
         model = Title
-        fields = ('year', 'name', 'genre', 'category')
+        fields = ('year', 'name', 'genre', 'category', 'q')
+
+    @staticmethod
+    def filter_genre(queryset, name, value):
+        # slug -> id по уникальному индексу, затем связи по индексу
+        # genre_title; подзапрос не размножает произведения
+        genre_ids = list(Genre.objects.filter(
+            slug__in=split_slugs(value)).values_list('id', flat=True))
+        return queryset.filter(pk__in=GenreTitle.objects.filter(
+            genre_id__in=genre_ids).values('title_id'))
+
+    @staticmethod
+    def filter_category(queryset, name, value):
+        category_ids = list(Category.objects.filter(
+            slug__in=split_slugs(value)).values_list('id', flat=True))
+        return queryset.filter(category_id__in=category_ids)
+
+    @staticmethod
+    def search(queryset, name, value):
+        """Полнотекстовый поиск с сортировкой по релевантности"""
+        return get_search_backend().search(queryset, value)
@@ -0,0 +1,135 @@
+import statistics
+import time
+from itertools import count
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, RequestFactory
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+from reviews.models import ConfirmationCode, Title, User
+
+from ...filters import TitleFilter
+from ...views import TitleViewSet
+
+
+def measure(func, repeat, timer=time.perf_counter):
+    """Выполняем func repeat раз, возвращаем длительности в миллисекундах.
+    С timer=time.process_time меряется процессорное время"""
+    timings = []
+    for _ in range(repeat):
+        started = timer()
+        func()
+        timings.append((timer() - started) * 1000)
+    return timings
+
+
+class Command(BaseCommand):
+    help = 'Measure latency of API hot paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=('search', 'signup', 'token'))
+        parser.add_argument('--repeat', type=int, default=100)
+        parser.add_argument(
+            '--term', action='append', dest='terms',
+            help='Search term, may be repeated (search scenario)')
+
+    def handle(self, *args, **options):
+        """Запускаем выбранный сценарий замеров."""
+        getattr(self, f'benchmark_{options["scenario"]}')(**options)
+
+    def report(self, label, timings):
+        timings = sorted(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(
+            f'{label}: среднее {statistics.mean(timings):.3f} мс, '
+            f'медиана {statistics.median(timings):.3f} мс, '
+            f'p95 {p95:.3f} мс')
+
+    def report_rate(self, label, timings):
+        self.report(label, timings)
+        self.stdout.write(
+            f'{label}: {len(timings) / sum(timings) * 1000:.0f} запросов/с')
+
+    def benchmark_search(self, terms, repeat, **options):
+        """Полнотекстовый поиск ?q= против фильтра ?name= по подстроке"""
+        if not terms:
+            names = Title.objects.values_list('name', flat=True)[:20]
+            terms = [name.split()[0] for name in names if name.split()]
+        if not terms:
+            raise CommandError('Нет произведений для поиска, задайте --term')
+
+        def run(param):
+            for term in terms:
+                queryset = TitleFilter({param: term},
+                                       queryset=TitleViewSet.queryset).qs
+                list(queryset[:10])
+
+        self.stdout.write(f'Запросов в серии: {len(terms)}, '
+                          f'повторов: {repeat}')
+        self.report('?name= (contains)', measure(lambda: run('name'), repeat))
+        self.report('?q= (полнотекстовый)', measure(lambda: run('q'), repeat))
+
+    def benchmark_signup(self, repeat, **options):
+        """Процессорное время регистрации: хеширование кода подтверждения
+        хешером паролей (прежний путь) против HMAC и запрос целиком.
+        Созданные при замерах пользователи откатываются"""
+        code = '123456'
+        self.stdout.write(f'Повторов: {repeat}, время процессорное')
+        self.report('make_password (PBKDF2)', measure(
+            lambda: make_password(code), repeat, time.process_time))
+        self.report('HMAC-SHA256', measure(
+            lambda: ConfirmationCode.objects.make_hash(1, code),
+            repeat, time.process_time))
+
+        client = Client()
+        numbers = count()
+
+        def signup():
+            number = next(numbers)
+            response = client.post('/api/v1/auth/signup/', {
+                'username': f'benchmark_{number}',
+                'email': f'benchmark_{number}@yamdb.fake'})
+            if response.status_code != 200:
+                raise CommandError(f'Ошибка регистрации: {response.content}')
+
+        with transaction.atomic():
+            self.report('POST /auth/signup/',
+                        measure(signup, repeat, time.process_time))
+            transaction.set_rollback(True)
+
+    def benchmark_token(self, repeat, **options):
+        """Пропускная способность выдачи токена: прежний путь (поиск
+        пользователя, затем аутентификация по паролю-хешу PBKDF2 и пара
+        токенов) против выдачи access-токена по коду подтверждения.
+        Созданный для замеров пользователь откатывается"""
+        client = Client()
+        legacy_view = TokenObtainPairView.as_view()
+        with transaction.atomic():
+            user = User.objects.create(username='benchmark_token',
+                                       email='benchmark_token@yamdb.fake')
+            code = ConfirmationCode.objects.issue(user)
+            user.set_password(code)
+            user.save()
+
+            def legacy():
+                request = RequestFactory().post('/api/v1/auth/token/', {
+                    'username': user.username, 'password': code})
+                User.objects.get(username=user.username)
+                response = legacy_view(request)
+                if response.status_code != 200:
+                    raise CommandError(f'Ошибка: {response.data}')
+
+            def token():
+                response = client.post('/api/v1/auth/token/', {
+                    'username': user.username, 'confirmation_code': code})
+                if response.status_code != 200:
+                    raise CommandError(f'Ошибка: {response.content}')
+
+            self.stdout.write(f'Повторов: {repeat}')
+            self.report_rate('До: пароль PBKDF2 + пара токенов',
+                             measure(legacy, repeat))
+            self.report_rate('После: POST /auth/token/',
+                             measure(token, repeat))
+            transaction.set_rollback(True)
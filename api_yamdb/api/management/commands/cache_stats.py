@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from ...cache import get_cache_stats, reset_cache_stats
+
+CACHES = ('title-detail',)
+
+
+class Command(BaseCommand):
+    help = 'Report hit/miss counters of the API object caches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Reset counters after reporting')
+
+    def handle(self, *args, **options):
+        """Выводим попадания и промахи кешей, при необходимости сбрасываем."""
+        for name in CACHES:
+            hits, misses = get_cache_stats(name)
+            total = hits + misses
+            ratio = hits / total * 100 if total else 0
+            self.stdout.write(
+                f'{name}: попаданий {hits}, промахов {misses}, '
+                f'доля попаданий {ratio:.1f}%')
+            if options['reset']:
+                reset_cache_stats(name)
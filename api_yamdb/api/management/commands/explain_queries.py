@@ -0,0 +1,100 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from reviews.models import Category, Comment, Genre, GenreTitle, Review, User
+
+from ...filters import TitleFilter
+from ...views import TitleViewSet
+
+# Признаки полного прохода по таблице в планах запросов
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?(?!CONSTANT|SUBQUERY)(\w+)'),
+    'postgresql': re.compile(r'\bSeq Scan on (\w+)'),
+}
+
+# Запросы, для которых полный проход ожидаем, и почему он допустим.
+# Команда не падает на них, но выводит причину в отчете
+EXPECTED_FULL_SCANS = {
+    'страница произведений': (
+        'без фильтров читается вся таблица по первичному ключу '
+        'до LIMIT страницы; для глубоких страниц есть ?cursor='),
+    'произведения по подстроке названия': (
+        'LIKE с подстрокой не использует индекс B-tree; '
+        'поиск по индексу FTS5 доступен через ?q='),
+}
+
+
+def representative_queries():
+    """Запросы, которые API выполняет на горячих путях"""
+    titles = TitleViewSet.queryset
+    # фильтры по slug сначала ищут id в БД, поэтому нужны реальные slug
+    genres = ','.join(Genre.objects.values_list('slug', flat=True)[:2])
+    category = Category.objects.values_list('slug', flat=True).first()
+    queries = {
+        'страница произведений': titles[:10],
+        'произведения по подстроке названия': TitleFilter(
+            {'name': 'сад'}, queryset=titles).qs[:10],
+        'произведение по id': titles.filter(pk=1),
+        'произведения по году': titles.filter(year=2000),
+        'жанры страницы произведений': Genre.objects.filter(
+            title__in=[1, 2, 3]),
+        'произведения жанра': GenreTitle.objects.filter(
+            genre_id=1).values('title_id'),
+        'категория по slug': Category.objects.filter(slug='movie'),
+        'отзывы произведения по дате': Review.objects.filter(
+            title_id=1).order_by('-pub_date', '-id')[:10],
+        'отзыв произведения': Review.objects.filter(pk=1, title_id=1),
+        'комментарии отзыва по дате': Comment.objects.filter(
+            review_id=1).order_by('-pub_date', '-id')[:10],
+        'пользователь по username': User.objects.filter(username='me'),
+    }
+    if category:
+        queries['произведения по категории'] = TitleFilter(
+            {'category': category}, queryset=titles).qs
+    if genres:
+        queries['произведения по жанрам'] = TitleFilter(
+            {'genre': genres}, queryset=titles).qs
+    return queries
+
+
+class Command(BaseCommand):
+    help = ('Run EXPLAIN on representative API queries and fail if any '
+            'of them does a full table scan outside the listed exemptions')
+
+    def handle(self, *args, **options):
+        """Проверяем планы запросов на полный проход по таблицам."""
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(
+                f'Разбор планов для {connection.vendor} не поддерживается')
+
+        failed = []
+        exempted = []
+        for name, queryset in representative_queries().items():
+            plan = queryset.explain()
+            scanned = pattern.findall(plan)
+            if scanned and name in EXPECTED_FULL_SCANS:
+                exempted.append(name)
+                self.stdout.write(self.style.WARNING(
+                    f'{name}: полный проход допустим, '
+                    f'{EXPECTED_FULL_SCANS[name]}'))
+            elif scanned:
+                failed.append(f'{name}: {", ".join(scanned)}')
+                self.stdout.write(self.style.ERROR(f'{name}:'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name}:'))
+            if options['verbosity'] > 1 or scanned:
+                self.stdout.write(plan)
+
+        if failed:
+            raise CommandError(
+                'Полный проход по таблицам в запросах:\n' + '\n'.join(failed))
+        if exempted:
+            self.stdout.write(self.style.WARNING(
+                '...Остальные запросы используют индексы, полный проход '
+                f'допущен в исключениях: {", ".join(exempted)}...'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                '...Все запросы используют индексы...'))
@@ -1,14 +1,189 @@
-from rest_framework import mixins, viewsets
+import math
 
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import mixins, permissions, serializers, viewsets
+from rest_framework.response import Response
+
+from .cache import (count_cache_access, get_object_version, get_or_compute,
+                    get_table_modified, get_versioned_key)
 from .permissions import (IsAdminOrReadOnlyPermission,
                           IsAuthorOrStaffOrReadOnlyPermission)
 
 
+def get_cache_dependencies(view):
+    """Модели, от которых зависят ответы вьюсета"""
+    return (getattr(view, 'cache_dependencies', None)
+            or (view.get_queryset().model,))
+
+
+class CachedListMixin:
+    """Миксин, который кеширует ответ списка по полному пути запроса
+    (поиск, limit, offset) до следующей записи в таблицы вьюсета.
+    С response_cache_single_flight промах по одному ключу пересчитывает
+    только один обработчик, с response_cache_serve_stale остальным
+    на время пересчета отдается предыдущий ответ"""
+    response_cache_timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+    response_cache_single_flight = False
+    response_cache_serve_stale = False
+
+    def list(self, request, *args, **kwargs):
+        parts = (request.get_full_path(), request.accepted_renderer.format)
+        key = get_versioned_key(
+            'response', get_cache_dependencies(self), *parts)
+        entry = cache.get(key)
+        if entry is not None:
+            return self.cached_list_response(entry)
+
+        response = None
+        list_view = super().list
+        # валидаторы (ETag, Last-Modified) ConditionalGetMixin,
+        # под которыми считается ответ, кешируются вместе с ним
+        validators = getattr(self, 'response_validators', None)
+
+        def compute():
+            nonlocal response
+            response = list_view(request, *args, **kwargs)
+            if response.status_code == 200:
+                return validators, response.data
+            return None
+
+        if not self.response_cache_single_flight:
+            entry = compute()
+            if entry is not None:
+                cache.set(key, entry, self.response_cache_timeout)
+            return response
+        entry = get_or_compute(
+            key, compute, self.response_cache_timeout,
+            stale_key=(get_versioned_key('stale-response', (), *parts)
+                       if self.response_cache_serve_stale else None),
+            stale_timeout=settings.RESPONSE_CACHE_STALE_TIMEOUT,
+            lock_timeout=settings.RESPONSE_CACHE_LOCK_TIMEOUT,
+            wait=settings.RESPONSE_CACHE_WAIT)
+        if response is not None:
+            return response
+        return self.cached_list_response(entry)
+
+    @staticmethod
+    def cached_list_response(entry):
+        validators, data = entry
+        response = Response(data)
+        # устаревший ответ отдается со своими валидаторами, а не текущими,
+        # иначе клиент получит 304 на старые данные
+        response.validators = validators
+        return response
+
+
+class CachedRetrieveMixin:
+    """Миксин, который кеширует сериализованный объект вместе с версией
+    объекта, прочитанной до запроса к БД. Запись из кеша отдается, пока
+    версия не изменилась. Версию сдвигают сигналы при изменении самого
+    объекта и данных, которые попадают в его ответ (api.signals).
+    Попадания и промахи считаются в статистике кеша object_cache_name"""
+    object_cache_timeout = getattr(settings, 'OBJECT_CACHE_TIMEOUT', 300)
+    object_cache_name = None
+
+    def retrieve(self, request, *args, **kwargs):
+        model = self.get_queryset().model
+        pk = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        key = (f'object:{model._meta.label_lower}:{pk}:'
+               f'{request.accepted_renderer.format}')
+        version = get_object_version(model, pk)
+        entry = cache.get(key)
+        hit = entry is not None and entry[0] == version
+        count_cache_access(
+            self.object_cache_name or model._meta.label_lower, hit)
+        requested = getattr(self, 'get_requested_fields', lambda: None)()
+        if hit:
+            # в кеше полный ответ, для ?fields= оставляем нужные поля
+            return Response({name: value for name, value in entry[1].items()
+                             if requested is None or name in requested})
+        response = super().retrieve(request, *args, **kwargs)
+        if requested is None:
+            cache.set(key, (version, response.data),
+                      self.object_cache_timeout)
+        return response
+
+
+class SparseFieldsetsMixin:
+    """Миксин для чтения с параметром ?fields=id,name: в ответе только
+    перечисленные поля, а запрос к БД читает только нужные столбцы.
+    sparse_fields описывает поля ответа, которым нужно не одноименное
+    поле модели: {'поле': {'only': (...), 'select_related': (...),
+    'prefetch_related': (...)}}. Связанные таблицы без запрошенных
+    полей не присоединяются и не подгружаются"""
+    fields_query_param = 'fields'
+    sparse_fields = {}
+
+    def get_requested_fields(self):
+        if hasattr(self, '_requested_fields'):
+            return self._requested_fields
+        value = self.request.query_params.get(self.fields_query_param)
+        self._requested_fields = None
+        if value and self.request.method in permissions.SAFE_METHODS:
+            requested = {name.strip() for name in value.split(',')
+                         if name.strip()}
+            unknown = requested - set(self.get_serializer_class()().fields)
+            if unknown:
+                raise serializers.ValidationError({
+                    self.fields_query_param: [
+                        f'Неизвестные поля: {", ".join(sorted(unknown))}']})
+            self._requested_fields = requested
+        return self._requested_fields
+
+    def get_queryset(self):
+        return self.sparse_queryset(super().get_queryset())
+
+    def sparse_queryset(self, queryset):
+        """Сужаем queryset до полей из ?fields=. Вьюсеты со своим
+        get_queryset вызывают этот метод сами"""
+        requested = self.get_requested_fields()
+        if requested is None:
+            return queryset
+        # поля упорядочивания курсорная пагинация читает у каждого
+        # объекта, а внешний ключ на родителя читает менеджер связи
+        # (title.reviews): отложенные, они стоили бы запроса на строку
+        ordering = (tuple(getattr(self, 'cursor_ordering', None) or ())
+                    + tuple(getattr(self, 'ordering', None) or ()))
+        only = {queryset.model._meta.pk.name}
+        only.update(name.lstrip('-') for name in ordering)
+        only.update(field.name for field in queryset._known_related_objects)
+        select_related, prefetch_related = set(), set()
+        for name in requested:
+            spec = self.sparse_fields.get(name, {'only': (name,)})
+            only.update(spec.get('only', ()))
+            select_related.update(spec.get('select_related', ()))
+            prefetch_related.update(spec.get('prefetch_related', ()))
+        model_fields = {field.name for field in queryset.model._meta.fields}
+        only = [name for name in only
+                if name.split('__')[0] in model_fields]
+        queryset = queryset.select_related(None).prefetch_related(
+            None).prefetch_related(*prefetch_related).only(*only)
+        if select_related:
+            # select_related() без аргументов присоединит все связи
+            queryset = queryset.select_related(*select_related)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        requested = self.get_requested_fields()
+        if requested is None:
+            return serializer
+        fields = getattr(serializer, 'child', serializer).fields
+        for name in set(fields) - requested:
+            fields.pop(name)
+        return serializer
+
+
 class CreateByAdminOrReadOnlyModelMixin(mixins.CreateModelMixin,
+                                        CachedListMixin,
                                         mixins.ListModelMixin,
                                         mixins.DestroyModelMixin,
                                         viewsets.GenericViewSet):
-    """Миксин-вьюсет для получения списка объектов
+    """Миксин-вьюсет для получения списка объектов (с кешированием)
     либо создания/удаления объекта админом"""
     permission_classes = (IsAdminOrReadOnlyPermission,)
 
@@ -18,3 +193,58 @@ class AuthorStaffOrReadOnlyModelMixin(viewsets.ModelViewSet):
     создания записей авторизованным ользователем,
     изменения/удаления автором/модератором/админом"""
     permission_classes = (IsAuthorOrStaffOrReadOnlyPermission,)
+
+
+class ParentObjectMixin:
+    """Миксин для вложенных вьюсетов. Родительский объект из URL
+    (произведение для отзывов, отзыв для комментариев) получается
+    один раз за запрос и переиспользуется вьюсетом, сериализатором
+    и проверками прав"""
+    parent_model = None
+    parent_url_kwarg = None
+
+    def get_parent_queryset(self):
+        return self.parent_model.objects.all()
+
+    def get_parent(self):
+        if not hasattr(self, '_parent'):
+            self._parent = get_object_or_404(
+                self.get_parent_queryset(),
+                pk=self.kwargs.get(self.parent_url_kwarg))
+        return self._parent
+
+
+class ConditionalGetMixin:
+    """Миксин для вьюсетов каталога: отдает ETag и Last-Modified,
+    посчитанные по версиям таблиц cache_dependencies, и отвечает 304
+    на If-None-Match/If-Modified-Since до выполнения запроса к БД
+    и сериализации. Обрабатывает список, для других действий
+    используйте conditional_response"""
+
+    def get_validators(self, request):
+        dependencies = get_cache_dependencies(self)
+        etag = get_versioned_key(
+            'etag', dependencies,
+            request.get_full_path(), request.accepted_renderer.format)
+        # Last-Modified с точностью до секунды округляем вверх
+        last_modified = math.ceil(get_table_modified(*dependencies))
+        return quote_etag(etag), last_modified
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        self.response_validators = self.get_validators(request)
+        etag, last_modified = self.response_validators
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            # ответ из кеша несет валидаторы версии, под которой посчитан
+            etag, last_modified = (getattr(response, 'validators', None)
+                                   or self.response_validators)
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, super().list, *args, **kwargs)
@@ -0,0 +1,115 @@
+import hashlib
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.response import Response
+
+from .cache import get_table_versions
+
+ESTIMATED_COUNT_SQL = {
+    'postgresql': ('SELECT reltuples::bigint FROM pg_class '
+                   'WHERE oid = %s::regclass'),
+    'sqlite': 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+}
+
+
+class CachedCountPagination(LimitOffsetPagination):
+    """Пагинация limit/offset, которая кеширует общее количество объектов
+    для каждой комбинации фильтров до следующей записи в таблицы вьюсета.
+    С параметром ?count=estimated для запросов без фильтров отдает
+    оценку количества из статистики БД. Поле count_exact в ответе
+    сообщает клиенту, точное ли значение count"""
+    count_query_param = 'count'
+    count_cache_timeout = getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT',
+                                  60)
+    count_exact = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.view = view
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count(self, queryset):
+        if (self.request.query_params.get(self.count_query_param)
+                == 'estimated' and not queryset.query.where):
+            count = self.get_estimated_count(queryset)
+            if count is not None:
+                self.count_exact = False
+                return count
+
+        dependencies = getattr(self.view, 'cache_dependencies',
+                               (queryset.model,))
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            # заведомо пустой queryset, например после .none()
+            return 0
+        key = hashlib.md5(repr(
+            (sql, params, get_table_versions(*dependencies))).encode())
+        key = f'pagination-count:{key.hexdigest()}'
+        count = cache.get(key)
+        if count is None:
+            count = super().get_count(queryset)
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    @staticmethod
+    def get_estimated_count(queryset):
+        """Оценка количества строк по статистике БД без полного прохода.
+        Возвращаем None, если статистика недоступна"""
+        connection = connections[queryset.db]
+        sql = ESTIMATED_COUNT_SQL.get(connection.vendor)
+        if sql is None:
+            return None
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+        except connection.Database.Error:
+            return None
+        if row is None:
+            return None
+        # в sqlite_stat1 первым числом записано количество строк таблицы
+        return max(int(str(row[0]).split()[0]), 0)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('count_exact', self.count_exact),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+
+class KeysetPagination(CursorPagination):
+    """Курсорная пагинация по стабильному индексированному ключу.
+    Не выполняет COUNT(*) и не пропускает строки через OFFSET"""
+    page_size_query_param = 'limit'
+    max_page_size = 1000
+
+
+class LimitOffsetOrCursorPagination(CachedCountPagination):
+    """Пагинация limit/offset по умолчанию.
+    Если в запросе передан параметр cursor (в том числе пустой),
+    переключается на курсорную пагинацию по ключу cursor_ordering вьюсета"""
+    cursor_query_param = 'cursor'
+    cursor_pagination_class = KeysetPagination
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+        self.cursor_paginator = self.cursor_pagination_class()
+        self.cursor_paginator.ordering = view.cursor_ordering
+        return self.cursor_paginator.paginate_queryset(
+            queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
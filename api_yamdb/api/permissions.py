@@ -26,11 +26,11 @@ class IsAuthorOrStaffOrReadOnlyPermission(permissions.BasePermission):
                 or request.user.is_authenticated)
 
     def has_object_permission(self, request, view, obj):
-        if request.method in permissions.SAFE_METHODS:
-            return True
-        return any([obj.author == request.user,
-                    request.user.is_admin,
-                    request.user.is_moderator])
+        # сравниваем id, не загружая автора записи
+        return (request.method in permissions.SAFE_METHODS
+                or obj.author_id == request.user.pk
+                or request.user.is_admin
+                or request.user.is_moderator)
 
 
 class IsAdminUserPermission(permissions.BasePermission):
@@ -1,6 +1,5 @@
 from datetime import datetime
 
-from django.shortcuts import get_object_or_404
 from rest_framework import serializers, validators
 
 from reviews.models import Category, Comment, Genre, Review, Title, User
@@ -33,7 +32,7 @@ class TitleSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('reviews_count', 'score_sum')
 
     @staticmethod
     def validate_year(value):
@@ -55,18 +54,17 @@ class ReadTitleSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('reviews_count', 'score_sum')
 
 
 class CurrentTitleDefault:
-    """Класс для получения дефолтного произведения из запроса"""
+    """Класс для получения дефолтного произведения из запроса.
+    Произведение берется у вьюсета, который получает его один раз
+    за запрос"""
     requires_context = True
 
     def __call__(self, serializer_field):
-        request = serializer_field.context.get('request')
-        title = get_object_or_404(
-            Title, pk=request.parser_context.get('kwargs').get('title_id'))
-        return title
+        return serializer_field.context['view'].get_parent()
 
     def __repr__(self):
         return '%s()' % self.__class__.__name__
@@ -89,10 +87,7 @@ class ReviewSerializer(serializers.ModelSerializer):
             )]
 
     def get_title(self):
-        request = self.context.get('request')
-        title = get_object_or_404(
-            Title, pk=request.parser_context.get('kwargs').get('title_id'))
-        return title
+        return self.context['view'].get_parent()
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -134,3 +129,8 @@ class UserSerializer(UserCreateThroughEmailSerializer):
         model = User
         fields = ('username', 'email',
                   'first_name', 'last_name', 'bio', 'role')
+
+
+class TokenObtainSerializer(serializers.Serializer):
+    username = serializers.CharField()
+    confirmation_code = serializers.CharField()
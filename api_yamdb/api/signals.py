@@ -0,0 +1,117 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
+
+from .authentication import (REVOKING_FIELDS, forget_token_version,
+                             forget_user_claims, set_token_version)
+from .cache import bump_object_version, bump_table_version
+
+VERSIONED_MODELS = (Category, Comment, Genre, GenreTitle, Review, Title, User)
+
+
+def bump_title_versions(*pks):
+    """Сдвигаем версии произведений, см. CachedRetrieveMixin"""
+    # сдвигаем после фиксации транзакции: иначе параллельный запрос
+    # может закешировать еще старые данные уже под новой версией
+    transaction.on_commit(lambda: bump_object_version(Title, *pks))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_version_on_write(sender, **kwargs):
+    if sender in VERSIONED_MODELS:
+        bump_table_version(sender)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def bump_version_on_genre_change(sender, action, instance, reverse, pk_set,
+                                 **kwargs):
+    if action == 'pre_clear' and reverse:
+        # после очистки уже не узнать, какие произведения были у жанра
+        instance._cleared_title_ids = list(
+            GenreTitle.objects.filter(genre=instance).values_list(
+                'title_id', flat=True))
+    if not action.startswith('post_'):
+        return
+    bump_table_version(GenreTitle)
+    if not reverse:
+        bump_title_versions(instance.pk)
+    elif action == 'post_clear':
+        bump_title_versions(*instance._cleared_title_ids)
+    else:
+        bump_title_versions(*pk_set)
+
+
+# Версии отдельных произведений: меняются при изменении всего,
+# что попадает в ответ GET /titles/{id}/
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def bump_title_version(sender, instance, **kwargs):
+    bump_title_versions(instance.pk)
+
+
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def bump_related_title_version(sender, instance, **kwargs):
+    bump_title_versions(instance.title_id)
+
+
+@receiver(post_save, sender=Category)
+def bump_category_titles_version(sender, instance, **kwargs):
+    bump_title_versions(*instance.title_set.values_list(
+        'pk', flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+def remember_category_titles(sender, instance, **kwargs):
+    # у произведений удаленной категории обнулится category,
+    # после удаления их уже не найти
+    instance._title_ids = list(instance.title_set.values_list(
+        'pk', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def bump_deleted_category_titles_version(sender, instance, **kwargs):
+    bump_title_versions(*instance._title_ids)
+
+
+@receiver(post_save, sender=Genre)
+def bump_genre_titles_version(sender, instance, **kwargs):
+    bump_title_versions(*GenreTitle.objects.filter(
+        genre=instance).values_list('title_id', flat=True))
+
+
+@receiver(pre_save, sender=User)
+def revoke_tokens_on_role_change(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    stored = User.objects.filter(pk=instance.pk).values(
+        'token_version', *REVOKING_FIELDS).first()
+    if stored is None or all(stored[field] == getattr(instance, field)
+                             for field in REVOKING_FIELDS):
+        return
+    # версию пишем отдельным запросом, чтобы она сохранилась
+    # и при save(update_fields=...)
+    User.objects.filter(pk=instance.pk).update(
+        token_version=F('token_version') + 1)
+    instance.token_version = stored['token_version'] + 1
+
+
+@receiver(post_save, sender=User)
+def update_token_version(sender, instance, **kwargs):
+    set_token_version(instance.pk, instance.token_version)
+    forget_user_claims(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def delete_token_version(sender, instance, **kwargs):
+    forget_token_version(instance.pk)
+    forget_user_claims(instance.pk)
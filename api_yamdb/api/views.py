@@ -1,34 +1,39 @@
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.views import PasswordResetView
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, mixins, permissions, status, viewsets
+from rest_framework import (filters, mixins, permissions, status, views,
+                            viewsets)
 from rest_framework.decorators import api_view
-from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
-from rest_framework_simplejwt.views import TokenObtainPairView
 
-from reviews.models import Category, Genre, Review, Title, User
+from reviews.models import (Category, ConfirmationCode, Genre, GenreTitle,
+                            Review, Title, User)
+from reviews.outbox import enqueue_email
 
+from .authentication import ClaimsAccessToken
 from .filters import TitleFilter
-from .mixins import (AuthorStaffOrReadOnlyModelMixin,
-                     CreateByAdminOrReadOnlyModelMixin)
+from .mixins import (AuthorStaffOrReadOnlyModelMixin, CachedListMixin,
+                     CachedRetrieveMixin, ConditionalGetMixin,
+                     CreateByAdminOrReadOnlyModelMixin, ParentObjectMixin,
+                     SparseFieldsetsMixin)
+from .pagination import CachedCountPagination, LimitOffsetOrCursorPagination
 from .permissions import IsAdminOrReadOnlyPermission, IsAdminUserPermission
 from .serializers import (CategorySerializer, CommentSerializer,
                           GenreSerializer, ReadTitleSerializer,
                           ReviewSerializer, TitleSerializer,
+                          TokenObtainSerializer,
                           UserCreateThroughEmailSerializer, UserSerializer)
 
 
-class CategoryViewSet(CreateByAdminOrReadOnlyModelMixin):
+class CategoryViewSet(ConditionalGetMixin, CreateByAdminOrReadOnlyModelMixin):
     """Доступные методы: GET (перечень), POST, DEL.
     На чтение доступ без токена, на добавление/удаление - админу
     Также требуется пагинация и поиск по названию категории"""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = CachedCountPagination
     filter_backends = (filters.SearchFilter,)
     filterset_fields = ('slug',)
     search_fields = ('name',)
@@ -36,12 +41,12 @@ class CategoryViewSet(CreateByAdminOrReadOnlyModelMixin):
     queryset = Category.objects.all()
 
 
-class GenreViewSet(CreateByAdminOrReadOnlyModelMixin):
+class GenreViewSet(ConditionalGetMixin, CreateByAdminOrReadOnlyModelMixin):
     """Доступные методы: GET (перечень), POST, DEL.
     На чтение доступ без токена, на добавление/удаление - админу
     Также требуется пагинация и поиск по названию жанра"""
     serializer_class = GenreSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = CachedCountPagination
     filter_backends = (filters.SearchFilter,)
     filterset_fields = ('slug',)
     search_fields = ('name',)
@@ -49,57 +54,103 @@ class GenreViewSet(CreateByAdminOrReadOnlyModelMixin):
     queryset = Genre.objects.all()
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(ConditionalGetMixin, CachedListMixin, CachedRetrieveMixin,
+                   SparseFieldsetsMixin, viewsets.ModelViewSet):
     """Доступные методы: GET (перечень либо отдельная запись), POST, PATCH, DEL.
     На чтение доступ без токена, на добавление/обновление/удаление - админу
-    Также требуется пагинация"""
-    queryset = Title.objects.annotate(rating=Avg('reviews__score')).all()
+    Также требуется пагинация (limit/offset либо курсорная по ?cursor=)"""
+    queryset = Title.objects.select_related(
+        'category').prefetch_related('genre')
     permission_classes = (IsAdminOrReadOnlyPermission,)
     filter_backends = (DjangoFilterBackend,)
-    pagination_class = LimitOffsetPagination
+    pagination_class = LimitOffsetOrCursorPagination
+    cursor_ordering = ('-id',)
+    # рейтинг меняется вместе с отзывами
+    cache_dependencies = (Title, Category, Genre, GenreTitle, Review)
     filterset_class = TitleFilter
     serializer_class = TitleSerializer
+    object_cache_name = 'title-detail'
+    response_cache_single_flight = True
+    response_cache_serve_stale = True
+    sparse_fields = {
+        'rating': {'only': ('reviews_count', 'score_sum')},
+        'category': {'only': ('category__name', 'category__slug'),
+                     'select_related': ('category',)},
+        'genre': {'only': (), 'prefetch_related': ('genre',)},
+    }
 
     def get_serializer_class(self):
         if self.request.method in permissions.SAFE_METHODS:
             return ReadTitleSerializer
         return TitleSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, super().retrieve, *args, **kwargs)
 
-class ReviewViewSet(AuthorStaffOrReadOnlyModelMixin):
+
+class ReviewViewSet(ParentObjectMixin, SparseFieldsetsMixin,
+                    AuthorStaffOrReadOnlyModelMixin):
     """Методы:
     -GET (перечень либо отдельная запись) - доступ без токена,
     -POST - аутентифицированный юзер,
     -PATCH, DEL - автор, модератор или админ"""
     serializer_class = ReviewSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = LimitOffsetOrCursorPagination
+    cursor_ordering = ('-pub_date', '-id')
+    parent_model = Title
+    parent_url_kwarg = 'title_id'
+    sparse_fields = {'author': {'only': ('author__username',),
+                                'select_related': ('author',)}}
 
     def get_queryset(self):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        return title.reviews.all()
-
+        # автора получаем тем же запросом и читаем только
+        # столбцы, которые отдает сериализатор
+        return self.sparse_queryset(
+            self.get_parent().reviews.select_related('author').only(
+                'id', 'title', 'text', 'score', 'pub_date',
+                'author__username'))
+
+    # счетчики рейтинга произведения обновляют сигналы Review
+    # в той же транзакции, что и сам отзыв
+    @transaction.atomic
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user,
-                        title=title)
+        serializer.save(author=self.request.user, title=self.get_parent())
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
 
-class CommentViewSet(AuthorStaffOrReadOnlyModelMixin):
+
+class CommentViewSet(ParentObjectMixin, SparseFieldsetsMixin,
+                     AuthorStaffOrReadOnlyModelMixin):
     """Методы:
     -GET (перечень либо отдельная запись) - доступ без токена,
     -POST - аутентифицированный юзер,
     -PATCH, DEL - автор, модератор или админ"""
     serializer_class = CommentSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = LimitOffsetOrCursorPagination
+    cursor_ordering = ('-pub_date', '-id')
+    parent_model = Review
+    parent_url_kwarg = 'review_id'
+    sparse_fields = {'author': {'only': ('author__username',),
+                                'select_related': ('author',)}}
+
+    def get_parent_queryset(self):
+        # отзыв ищем вместе с произведением из URL одним запросом
+        return Review.objects.filter(title_id=self.kwargs.get('title_id'))
 
     def get_queryset(self):
-        review = get_object_or_404(Review, pk=self.kwargs.get('review_id'))
-        return review.comments.all()
+        return self.sparse_queryset(
+            self.get_parent().comments.select_related('author'))
 
     def perform_create(self, serializer):
-        review = get_object_or_404(Review, pk=self.kwargs.get('review_id'))
         serializer.save(author=self.request.user,
-                        review=review)
+                        review=self.get_parent())
 
 
 class UserCreateThroughEmailViewSet(viewsets.GenericViewSet,
@@ -109,23 +160,32 @@ class UserCreateThroughEmailViewSet(viewsets.GenericViewSet,
     permission_classes = (permissions.AllowAny,)
     serializer_class = UserCreateThroughEmailSerializer
 
+    @transaction.atomic
     def perform_create(self, serializer):
         # после валидации сериализатора сохраняем нового юзера
+        # без пароля: входит он по коду подтверждения
         email = self.request.data.get('email')
-        user = serializer.save()
-        # генерируем юзеру шестизначный код подтверждения с помощью токена
-        confirmation_code = self.token_generator.make_token(user=user)[-7:-1]
-        # шифруем и сохраняем в БД для конкретного пользователя
-        user.password = make_password(confirmation_code)
-        user.save()
+        user = serializer.instance
+        if user is None:
+            user = serializer.save(password=make_password(None))
+        # генерируем юзеру шестизначный код подтверждения,
+        # в БД сохраняется только его хеш
+        confirmation_code = ConfirmationCode.objects.issue(user)
         message = f'Your confirmation code is: {confirmation_code}'
-        send_mail(from_email=self.from_email,
-                  recipient_list=[email],
-                  subject='Email confirmation',
-                  message=message)
+        # письмо отправит обработчик очереди (команда send_outbox),
+        # ответ не ждет почтового сервера
+        enqueue_email(from_email=self.from_email,
+                      recipient_list=[email],
+                      subject='Email confirmation',
+                      message=message)
 
     def create(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
+        # повторная регистрация с той же парой username/email
+        # выдает существующему юзеру новый код подтверждения
+        existing = User.objects.filter(
+            username=request.data.get('username'),
+            email=request.data.get('email')).first()
+        serializer = self.get_serializer(existing, data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
@@ -135,7 +195,7 @@ class UserCreateThroughEmailViewSet(viewsets.GenericViewSet,
 
 class UserViewSet(viewsets.ModelViewSet):
     serializer_class = UserSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = CachedCountPagination
     permission_classes = (IsAdminUserPermission,)
     filter_backends = (filters.SearchFilter,)
     search_fields = ('username',)
@@ -163,10 +223,27 @@ def user_own_view(request):
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class MyTokenObtainPairView(TokenObtainPairView):
+class TokenObtainView(views.APIView):
+    """Выдает access-токен в обмен на username и код подтверждения.
+    Пользователь вместе с кодом читается одним запросом,
+    код проверяется HMAC без хешера паролей"""
+    permission_classes = (permissions.AllowAny,)
+    authentication_classes = ()
 
-    def post(self, *args, **kwargs):
-        if not (self.request.data and self.request.data.get('username')):
-            return Response(status=status.HTTP_400_BAD_REQUEST)
-        get_object_or_404(User, username=self.request.data.get('username'))
-        return super().post(self.request, *args, **kwargs)
+    def post(self, request):
+        serializer = TokenObtainSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = get_object_or_404(
+            User.objects.select_related('confirmation_code'),
+            username=serializer.validated_data['username'])
+        try:
+            confirmation_code = user.confirmation_code
+        except ConfirmationCode.DoesNotExist:
+            confirmation_code = None
+        if not (user.is_active and confirmation_code is not None
+                and confirmation_code.matches(
+                    serializer.validated_data['confirmation_code'])):
+            return Response(
+                {'confirmation_code': ['Неверный код подтверждения']},
+                status=status.HTTP_400_BAD_REQUEST)
+        return Response({'token': str(ClaimsAccessToken.for_user(user))})
@@ -107,15 +107,60 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
     ],
     'PAGE_SIZE': 10,
 }
 
+# Версии таблиц для ETag, кеши ответов и блокировки single-flight
+# хранятся в кеше. При нескольких процессах нужен общий кеш
+# (memcached, redis), иначе у каждого процесса свои версии
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Время жизни закешированного количества объектов в пагинации, секунды
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+
+# Время жизни закешированных ответов списков категорий и жанров, секунды.
+# Запись в таблицу сбрасывает кеш сразу
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Пересчет закешированного списка произведений: сколько секунд держится
+# блокировка пересчета, сколько ждут его результата другие запросы
+# и сколько хранится предыдущий ответ, который отдается во время пересчета
+RESPONSE_CACHE_LOCK_TIMEOUT = 10
+RESPONSE_CACHE_WAIT = 2
+RESPONSE_CACHE_STALE_TIMEOUT = 3600
+
+# Время жизни закешированного ответа GET /titles/{id}/, секунды.
+# Изменение произведения, его жанров, категории или отзывов сбрасывает кеш
+OBJECT_CACHE_TIMEOUT = 300
+
+# Сколько секунд версия токенов пользователя живет в кеше. С кешем
+# в памяти процесса это предел задержки отзыва токенов в других процессах
+TOKEN_VERSION_CACHE_TIMEOUT = 60
+
+# Сколько секунд роль пользователя живет в кеше процесса (для токенов
+# без claims). Изменения через API и ORM сбрасывают кеш сразу
+USER_ROLE_CACHE_TIMEOUT = 60
+
+# Бэкенд полнотекстового поиска по произведениям (параметр ?q=).
+# На БД без FTS5 можно использовать reviews.search.SubstringSearchBackend
+TITLE_SEARCH_BACKEND = 'reviews.search.SQLiteFTS5Backend'
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Письма ставятся в очередь и отправляются командой send_outbox.
+# True - отправлять сразу после сохранения письма в очередь
+EMAIL_OUTBOX_EAGER = False
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=5),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -123,3 +168,6 @@ SIMPLE_JWT = {
 }
 
 DEFAULT_FROM_EMAIL = 'yamdb_auth@yamdb.fake'
+
+# Срок действия кода подтверждения из письма при регистрации
+CONFIRMATION_CODE_LIFETIME = timedelta(days=1)
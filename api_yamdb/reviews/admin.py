@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Category, Comment, Genre, GenreTitle, Review, Title, User
+from .models import (Category, Comment, Genre, GenreTitle, OutboxEmail,
+                     Review, Title, User)
 
 
 class UserAdmin(admin.ModelAdmin):
@@ -51,6 +52,13 @@ class GenreTitleAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('to', 'subject', 'created', 'attempts', 'sent_at')
+    search_fields = ('to',)
+    empty_value_display = '-пусто-'
+    list_filter = ('sent_at',)
+
+
 admin.site.register(User, UserAdmin)
 admin.site.register(Title, TitleAdmin)
 admin.site.register(Category, CategoryAdmin)
@@ -58,3 +66,4 @@ admin.site.register(Genre, GenreAdmin)
 admin.site.register(Review, ReviewAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(GenreTitle, GenreTitleAdmin)
+admin.site.register(OutboxEmail, OutboxEmailAdmin)
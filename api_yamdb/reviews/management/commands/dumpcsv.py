@@ -0,0 +1,117 @@
+import csv
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+
+from .loaddata import FILE_MODEL_DICT, LOADING_ORDER
+
+# Столбцы файлов в том виде, в котором их читает loaddata
+FILE_COLUMNS = {
+    'category.csv': ('id', 'name', 'slug'),
+    'comments.csv': ('id', 'review_id', 'text', 'author', 'pub_date'),
+    'genre.csv': ('id', 'name', 'slug'),
+    'genre_title.csv': ('id', 'title_id', 'genre_id'),
+    'review.csv': ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+    'titles.csv': ('id', 'name', 'year', 'category', 'description'),
+    'users.csv': ('id', 'username', 'email', 'role', 'bio',
+                  'first_name', 'last_name'),
+}
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def export_rows(file, chunk_size):
+    """Построчно читаем таблицу курсором на стороне сервера"""
+    model = FILE_MODEL_DICT[file]
+    attnames = [model._meta.get_field(column).attname
+                for column in FILE_COLUMNS[file]]
+    return model.objects.order_by('pk').values_list(*attnames).iterator(
+        chunk_size=chunk_size)
+
+
+class CSVWriter:
+
+    def __init__(self, output, columns):
+        self.writer = csv.writer(output)
+        self.writer.writerow(columns)
+
+    def write(self, row):
+        self.writer.writerow(
+            '' if value is None
+            else value.isoformat() if hasattr(value, 'isoformat')
+            else value
+            for value in row)
+
+
+class JSONLinesWriter:
+
+    def __init__(self, output, columns):
+        self.output = output
+        self.columns = columns
+
+    def write(self, row):
+        self.output.write(json.dumps(
+            dict(zip(self.columns, row)),
+            cls=DjangoJSONEncoder, ensure_ascii=False))
+        self.output.write('\n')
+
+
+WRITERS = {'csv': CSVWriter, 'jsonl': JSONLinesWriter}
+
+
+class Command(BaseCommand):
+    help = 'Export reviews tables to CSV or JSON Lines files for loaddata'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files', nargs='*', metavar='file',
+            help='Files to export, all by default')
+        parser.add_argument('--output-dir', default='dump')
+        parser.add_argument('--format', choices=WRITERS, default='csv')
+        parser.add_argument('--compress', action='store_true',
+                            help='Write gzip-compressed files')
+        parser.add_argument('--chunk-size', type=int,
+                            default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Tables exported in parallel')
+
+    def handle(self, *args, **options):
+        """Выгружаем таблицы в файлы, при необходимости параллельно."""
+        unknown = set(options['files']) - set(LOADING_ORDER)
+        if unknown:
+            raise CommandError(f'Неизвестные файлы: {", ".join(unknown)}')
+        os.makedirs(options['output_dir'], exist_ok=True)
+        with ThreadPoolExecutor(max(options['workers'], 1)) as executor:
+            results = executor.map(
+                lambda file: self.export_file(file, **options),
+                options['files'] or LOADING_ORDER)
+            for path, rows, elapsed in results:
+                rate = rows / elapsed if elapsed else rows
+                self.stdout.write(self.style.SUCCESS(
+                    f'...Выгружено в {path}: {rows} строк '
+                    f'за {elapsed:.2f} с ({rate:.0f} строк/с)...'))
+
+    @staticmethod
+    def export_file(file, output_dir, compress, chunk_size, **options):
+        started = time.perf_counter()
+        file_format = options['format']
+        name = os.path.splitext(file)[0] + f'.{file_format}'
+        path = os.path.join(output_dir, name + ('.gz' if compress else ''))
+        opener = gzip.open if compress else open
+        rows = 0
+        try:
+            with opener(path, 'wt', encoding='UTF-8', newline='') as output:
+                writer = WRITERS[file_format](output, FILE_COLUMNS[file])
+                for row in export_rows(file, chunk_size):
+                    writer.write(row)
+                    rows += 1
+        finally:
+            # у каждого потока свое соединение с БД
+            connection.close()
+        return path, rows, time.perf_counter() - started
@@ -1,7 +1,16 @@
 import csv
 import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import ExitStack
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from django.db.models import F
 
 from api_yamdb import settings
 from reviews import models
@@ -22,9 +31,6 @@ TABLES_FOREIGN_KEYS = {
     'comments.csv': {
         'author': lambda pk: models.User.objects.get(pk=pk),
         'review': lambda pk: models.Review.objects.get(pk=pk)},
-    'genre_title.csv': {
-        'genre': lambda pk: models.GenreTitle.objects.get(genre_id=pk),
-        'title': lambda pk: models.GenreTitle.objects.get(title_id=pk)},
     'review.csv': {
         'author': lambda pk: models.User.objects.get(pk=pk),
         'title': lambda pk: models.Title.objects.get(pk=pk)},
@@ -32,17 +38,268 @@ TABLES_FOREIGN_KEYS = {
         'category': lambda pk: models.Category.objects.get(pk=pk)},
 }
 
+# Таблицы связей многие-ко-многим загружаются парами id целиком
+LINK_TABLE_FILES = {'genre_title.csv'}
+
 LOADING_ORDER = ['category.csv', 'genre.csv', 'titles.csv', 'genre_title.csv',
                  'users.csv', 'review.csv', 'comments.csv']
 
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def get_row_converter(model, fieldnames):
+    """Готовим функцию, которая превращает строку CSV в словарь
+    аргументов модели. Внешние ключи записываются в *_id как есть,
+    без запросов к связанным таблицам"""
+    fields = [(name, model._meta.get_field(name)) for name in fieldnames]
+
+    def convert(row):
+        data = {}
+        for name, field in fields:
+            value = row[name]
+            if value == '' and field.null:
+                value = None
+            elif field.is_relation:
+                value = field.target_field.to_python(value)
+            else:
+                value = field.to_python(value)
+            data[field.attname] = value
+        return data
+    return convert
+
+
+class ReferenceChecker:
+    """Проверяет, что строки ссылаются на существующие записи:
+    id каждой связанной таблицы читаются из БД одним запросом
+    за загрузку, дальше только проверка вхождения в множество.
+    Множества пополняются id записанных строк"""
+
+    def __init__(self):
+        self.known = {}
+
+    def get_known(self, model):
+        if model not in self.known:
+            self.known[model] = set(
+                model.objects.values_list('pk', flat=True))
+        return self.known[model]
+
+    def check(self, model, rows):
+        for field in model._meta.concrete_fields:
+            if not field.is_relation:
+                continue
+            missing = ({data[field.attname] for data in rows}
+                       - self.get_known(field.related_model) - {None})
+            if missing:
+                raise CommandError(
+                    f'{field.attname} ссылается на несуществующие записи '
+                    f'{field.related_model.__name__}: {sorted(missing)}')
+
+    def add(self, model, rows):
+        if model in self.known:
+            pk_name = model._meta.pk.attname
+            self.known[model].update(data[pk_name] for data in rows)
+
+
+def check_references(model, rows):
+    ReferenceChecker().check(model, rows)
+
+
+def parse_chunk(file, fieldnames, rows):
+    """Разбираем и проверяем пачку строк файла.
+    Выполняется в процессах-обработчиках, к БД не обращается"""
+    convert = get_row_converter(FILE_MODEL_DICT[file], fieldnames)
+    return [convert(row) for row in rows]
+
+
+def get_dependency_stages(files):
+    """Разбиваем файлы на этапы по внешним ключам моделей: файл
+    попадает в этап после файлов всех моделей, на которые он ссылается.
+    Файлы одного этапа друг от друга не зависят"""
+    model_files = {FILE_MODEL_DICT[file]: file for file in files}
+    dependencies = {}
+    for file in files:
+        model = FILE_MODEL_DICT[file]
+        dependencies[file] = {
+            model_files[field.related_model]
+            for field in model._meta.concrete_fields
+            if field.is_relation and field.related_model is not model
+            and field.related_model in model_files}
+    stages = []
+    loaded = set()
+    while dependencies:
+        stage = [file for file in files
+                 if file in dependencies and dependencies[file] <= loaded]
+        if not stage:
+            raise CommandError(
+                'Циклическая зависимость между файлами: '
+                + ', '.join(dependencies))
+        stages.append(stage)
+        loaded.update(stage)
+        for file in stage:
+            del dependencies[file]
+    return stages
+
+
+class InlineExecutor:
+    """Выполняет задачи сразу в текущем процессе (один обработчик)"""
+
+    def submit(self, func, *args):
+        future = Future()
+        future.set_result(func(*args))
+        return future
+
+    def shutdown(self):
+        pass
+
+
+class CSVOffsetReader:
+    """Читает CSV-файл построчно и помнит байтовое смещение конца
+    последней прочитанной записи, чтобы с него можно было продолжить"""
+
+    def __init__(self, file, offset=0):
+        self.file = file
+        self.position = 0
+        self.reader = csv.reader(self.iter_lines())
+        self.fieldnames = next(self.reader)
+        if offset:
+            self.file.seek(offset)
+            self.position = offset
+
+    def iter_lines(self):
+        # csv.reader забирает строки по одной и ровно столько,
+        # сколько нужно для записи, включая переводы строк внутри кавычек
+        for line in iter(self.file.readline, b''):
+            self.position += len(line)
+            yield line.decode('UTF-8')
+
+    def __iter__(self):
+        for row in self.reader:
+            if row:
+                yield dict(zip(self.fieldnames, row))
+
+
+def iter_chunks(reader, size):
+    """Отдаем пачки строк и смещение конца каждой пачки"""
+    iterator = iter(reader)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk, reader.position
+        chunk = list(islice(iterator, size))
+
+
+def iter_stage_chunks(stack, offsets, chunk_size):
+    """Открываем файлы этапа с сохраненных смещений и отдаем пачки строк
+    (файл, заголовок, строки, смещение) по очереди из каждого файла"""
+    chunks = {}
+    for file, offset in offsets.items():
+        reader = CSVOffsetReader(stack.enter_context(
+            open(os.path.join(CSV_DATA_PATH, file), 'rb')), offset)
+        chunks[file] = (reader.fieldnames, iter_chunks(reader, chunk_size))
+    while chunks:
+        for file, (fieldnames, file_chunks) in list(chunks.items()):
+            chunk, offset = next(file_chunks, (None, None))
+            if chunk is None:
+                del chunks[file]
+                continue
+            yield file, fieldnames, chunk, offset
+
+
+def upsert_objects(model, rows):
+    """Создаем новые строки и обновляем уже загруженные по id из CSV"""
+    pk_name = model._meta.pk.attname
+    existing = set(model.objects.filter(
+        pk__in=[data[pk_name] for data in rows]).values_list('pk', flat=True))
+    model.objects.bulk_create(
+        model(**data) for data in rows if data[pk_name] not in existing)
+    update_fields = [
+        name for name in rows[0] if name != pk_name
+        and not getattr(model._meta.get_field(name), 'auto_now_add', False)]
+    if existing and update_fields:
+        model.objects.bulk_update(
+            [model(**data) for data in rows if data[pk_name] in existing],
+            update_fields)
+
 
 class Command(BaseCommand):
     help = 'Load data from .csv file into database'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bulk', action='store_true',
+            help='Stream files in chunks and write them with bulk_create')
+        parser.add_argument(
+            '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+            help='Rows per bulk_create transaction in --bulk mode')
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Processes parsing CSV chunks, implies --bulk')
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Continue from the saved checkpoints, implies --bulk')
+        parser.add_argument(
+            '--upsert', action='store_true',
+            help='Update rows that already exist by CSV id, implies --bulk')
+
     def handle(self, *args, **options):
         """Загружаем файлы из csv в БД."""
         files = LOADING_ORDER
 
+        try:
+            if any(options[name] for name in ('bulk', 'resume', 'upsert')) or (
+                    options['workers'] > 1):
+                self.load_files_bulk(files, **options)
+            else:
+                self.load_files(files)
+        finally:
+            # отзывы загружаются в обход API, поэтому счетчики рейтинга
+            # пересчитываем целиком, даже если загрузка прервалась
+            models.Title.objects.rebuild_ratings()
+            # закешированные ответы API построены по старым данным
+            cache.clear()
+
+    def load_files_bulk(self, files, workers, chunk_size, resume, upsert,
+                        **options):
+        executor = (ProcessPoolExecutor(workers)
+                    if workers > 1 else InlineExecutor())
+        references = ReferenceChecker()
+        try:
+            for stage in get_dependency_stages(files):
+                offsets = self.get_start_offsets(stage, resume)
+                if offsets:
+                    self.load_stage(offsets, chunk_size, executor,
+                                    max(workers, 1), upsert, references)
+        finally:
+            executor.shutdown()
+
+    def get_start_offsets(self, stage, resume):
+        """Определяем, с какого байта читать каждый файл этапа.
+        Без --resume контрольные точки сбрасываются"""
+        offsets = {}
+        for file in stage:
+            stat = os.stat(os.path.join(CSV_DATA_PATH, file))
+            checkpoint = models.ImportCheckpoint.objects.filter(
+                file=file).first()
+            if resume and checkpoint is not None:
+                if (checkpoint.file_size, checkpoint.file_mtime) != (
+                        stat.st_size, stat.st_mtime_ns):
+                    raise CommandError(
+                        f'Файл {file} изменился после прошлой загрузки, '
+                        f'продолжить с контрольной точки нельзя')
+                if checkpoint.finished:
+                    self.stdout.write(
+                        f'...Файл {file} уже загружен, пропускаем...')
+                    continue
+                offsets[file] = checkpoint.offset
+                continue
+            models.ImportCheckpoint.objects.update_or_create(
+                file=file, defaults={
+                    'offset': 0, 'rows': 0, 'finished': False,
+                    'file_size': stat.st_size,
+                    'file_mtime': stat.st_mtime_ns})
+            offsets[file] = 0
+        return offsets
+
+    def load_files(self, files):
         #  Проходим каждый файл
         for file in files:
             try:
@@ -50,24 +307,117 @@ class Command(BaseCommand):
                           encoding='UTF-8', newline='') as csv_file:
                     # Считываем данные из csv в виде словаря
                     reader = csv.DictReader(csv_file)
-                    # Формируем данные.
-                    # Если поле является ForeignKey,
-                    # то берем из связанной модели конкретный экземпляр
-                    # с помощью TABLES_FOREIGN_KEYS
-                    for row in reader:
-                        data = {}
-                        for k, v in row.items():
-                            if (TABLES_FOREIGN_KEYS.get(file)
-                                    and k in TABLES_FOREIGN_KEYS.get(file)):
-                                data[k] = TABLES_FOREIGN_KEYS[file][k](int(v))
-                            else:
-                                data[k] = v
-                        # записываем подготовленные данные в БД
-                        FILE_MODEL_DICT[file].objects.create(**data)
+                    if file in LINK_TABLE_FILES:
+                        self.load_link_table(file, reader)
+                    else:
+                        self.load_rows(file, reader)
             except Exception as error:
-                self.stdout.write('ПРОИЗОШЛА ОШИБКА:')
-                self.stdout.write(error)
+                raise CommandError(
+                    f'Ошибка загрузки файла {file}: {error}. Для повторного '
+                    f'запуска без дубликатов используйте --upsert') from error
             else:
                 self.stdout.write(
                     self.style.SUCCESS(
                         f'...Данные успешно загружены из файла {file}...'))
+
+    @staticmethod
+    def load_rows(file, reader):
+        # Формируем данные.
+        # Если поле является ForeignKey,
+        # то берем из связанной модели конкретный экземпляр
+        # с помощью TABLES_FOREIGN_KEYS
+        for row in reader:
+            data = {}
+            for k, v in row.items():
+                if (TABLES_FOREIGN_KEYS.get(file)
+                        and k in TABLES_FOREIGN_KEYS.get(file)):
+                    data[k] = TABLES_FOREIGN_KEYS[file][k](int(v))
+                else:
+                    data[k] = v
+            # записываем подготовленные данные в БД
+            FILE_MODEL_DICT[file].objects.create(**data)
+
+    @staticmethod
+    def load_link_table(file, reader):
+        """Загружаем таблицу связей парами id одним bulk_create,
+        предварительно проверив, что обе стороны связи существуют"""
+        model = FILE_MODEL_DICT[file]
+        convert = get_row_converter(model, reader.fieldnames)
+        rows = [convert(row) for row in reader]
+        check_references(model, rows)
+        model.objects.bulk_create(
+            (model(**data) for data in rows), batch_size=DEFAULT_CHUNK_SIZE)
+
+    def load_stage(self, offsets, chunk_size, executor, workers, upsert,
+                   references):
+        """Загружаем независимые файлы этапа. Пачки строк читаются
+        по очереди из всех файлов и разбираются обработчиками
+        параллельно, а записывает их в БД один писатель - текущий процесс,
+        каждую пачку отдельной транзакцией вместе с контрольной точкой.
+        Ссылки пачки проверяются по множествам id до записи, поэтому
+        контрольная точка не сдвигается за непроверенные строки"""
+        stage = list(offsets)
+        started = time.perf_counter()
+        rows = dict.fromkeys(stage, 0)
+        elapsed = dict.fromkeys(stage, 0.0)
+        pending = deque()
+
+        def write_next():
+            file, future, offset = pending.popleft()
+            try:
+                parsed = future.result()
+            except (ValidationError, ValueError) as error:
+                raise CommandError(f'Ошибка разбора файла {file}: {error}')
+            self.write_checked_chunk(file, parsed, offset, upsert, references)
+            rows[file] += len(parsed)
+            elapsed[file] = time.perf_counter() - started
+
+        with ExitStack() as stack:
+            stage_chunks = iter_stage_chunks(stack, offsets, chunk_size)
+            for file, fieldnames, chunk, offset in stage_chunks:
+                pending.append((file, executor.submit(
+                    parse_chunk, file, fieldnames, chunk), offset))
+                if len(pending) > workers * 2:
+                    write_next()
+            while pending:
+                write_next()
+        models.ImportCheckpoint.objects.filter(
+            file__in=stage).update(finished=True)
+
+        for file in stage:
+            rate = rows[file] / elapsed[file] if elapsed[file] else rows[file]
+            self.stdout.write(self.style.SUCCESS(
+                f'...Данные успешно загружены из файла {file}: '
+                f'{rows[file]} строк за {elapsed[file]:.2f} с '
+                f'({rate:.0f} строк/с)...'))
+
+    def write_checked_chunk(self, file, rows, offset, upsert, references):
+        """Проверяем ссылки пачки и записываем ее"""
+        model = FILE_MODEL_DICT[file]
+        try:
+            references.check(model, rows)
+        except CommandError as error:
+            # пачка не записана, контрольная точка осталась перед ней
+            raise CommandError(
+                f'Нарушена ссылочная целостность в {file}: {error}. '
+                f'Добавьте недостающие записи и продолжите загрузку '
+                f'с --resume либо исправьте файл и загрузите его '
+                f'заново с --upsert')
+        try:
+            self.write_chunk(file, rows, offset, upsert)
+        except IntegrityError as error:
+            raise CommandError(
+                f'Ошибка загрузки файла {file}: {error}. Для повторного '
+                f'запуска без дубликатов используйте --upsert') from error
+        references.add(model, rows)
+
+    @staticmethod
+    def write_chunk(file, rows, offset, upsert):
+        model = FILE_MODEL_DICT[file]
+        with transaction.atomic():
+            if upsert:
+                upsert_objects(model, rows)
+            else:
+                model.objects.bulk_create(model(**data) for data in rows)
+            models.ImportCheckpoint.objects.filter(file=file).update(
+                offset=offset, rows=F('rows') + len(rows))
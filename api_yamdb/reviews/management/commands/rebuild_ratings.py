@@ -0,0 +1,37 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    help = 'Rebuild denormalized title rating counters from reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report drifted counters, do not fix them')
+
+    def handle(self, *args, **options):
+        """Пересчитываем счетчики рейтинга и сообщаем о расхождениях."""
+        commit = not options['dry_run']
+        with transaction.atomic():
+            drifted = Title.objects.rebuild_ratings(commit=commit)
+        if commit and drifted:
+            # закешированные ответы API построены по старым счетчикам
+            cache.clear()
+
+        for pk, stored, expected in drifted:
+            self.stdout.write(
+                f'Произведение {pk}: было (отзывов, сумма оценок) = '
+                f'{stored}, стало {expected}')
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS(
+                '...Расхождений в счетчиках рейтинга не найдено...'))
+        elif commit:
+            self.stdout.write(self.style.SUCCESS(
+                f'...Исправлено произведений: {len(drifted)}...'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'...Найдено расхождений: {len(drifted)}...'))
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews import outbox
+
+
+class Command(BaseCommand):
+    help = 'Send queued outbox emails over one reused mail connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=outbox.DEFAULT_BATCH_SIZE,
+                            help='Emails sent over one connection')
+        parser.add_argument('--max-attempts', type=int,
+                            default=outbox.DEFAULT_MAX_ATTEMPTS)
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling the queue')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds between polls in --loop mode')
+        parser.add_argument('--stats', action='store_true',
+                            help='Only report queue depth')
+
+    def handle(self, *args, **options):
+        """Отправляем письма из очереди, в режиме --loop постоянно."""
+        if options['stats']:
+            self.report_stats(options['max_attempts'])
+            return
+        while True:
+            sent, failed = outbox.send_pending(
+                options['batch_size'], options['max_attempts'])
+            if sent or failed:
+                self.stdout.write(
+                    f'...Отправлено писем: {sent}, '
+                    f'отложено до повторной попытки: {failed}...')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.report_stats(options['max_attempts'])
+
+    def report_stats(self, max_attempts):
+        stats = outbox.queue_stats(max_attempts)
+        self.stdout.write(
+            f'В очереди писем: {stats["pending"]}, '
+            f'готовы к отправке: {stats["due"]}, '
+            f'исчерпали попытки: {stats["failed"]}')
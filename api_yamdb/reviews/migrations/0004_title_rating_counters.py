@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:52
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_rating_counters(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    titles = []
+    for row in Review.objects.values('title_id').annotate(
+            count=Count('id'), total=Sum('score')):
+        titles.append(Title(pk=row['title_id'],
+                            reviews_count=row['count'],
+                            score_sum=row['total']))
+    Title.objects.bulk_update(titles, ['reviews_count', 'score_sum'],
+                              batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_auto_20211224_1812'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество отзывов'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок'),
+        ),
+        migrations.RunPython(fill_rating_counters,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:10
+
+from django.db import migrations
+
+# Внешнее содержимое FTS5 берется из таблицы titles,
+# индекс поддерживается триггерами на запись в нее
+CREATE_SQL = [
+    """CREATE VIRTUAL TABLE titles_fts USING fts5(
+        name, description, content='titles', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER titles_fts_insert AFTER INSERT ON titles BEGIN
+        INSERT INTO titles_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+    """CREATE TRIGGER titles_fts_delete AFTER DELETE ON titles BEGIN
+        INSERT INTO titles_fts(titles_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    """CREATE TRIGGER titles_fts_update
+    AFTER UPDATE OF name, description ON titles BEGIN
+        INSERT INTO titles_fts(titles_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO titles_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+    "INSERT INTO titles_fts(titles_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS titles_fts_insert',
+    'DROP TRIGGER IF EXISTS titles_fts_delete',
+    'DROP TRIGGER IF EXISTS titles_fts_update',
+    'DROP TABLE IF EXISTS titles_fts',
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(CREATE_SQL),
+                             run_on_sqlite(DROP_SQL)),
+    ]
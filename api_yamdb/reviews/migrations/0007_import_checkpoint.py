@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_title_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.CharField(max_length=255, unique=True)),
+                ('offset', models.BigIntegerField(default=0, verbose_name='Смещение в байтах')),
+                ('rows', models.BigIntegerField(default=0, verbose_name='Загружено строк')),
+                ('file_size', models.BigIntegerField(verbose_name='Размер файла')),
+                ('file_mtime', models.BigIntegerField(verbose_name='Время изменения файла')),
+                ('finished', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name': 'Контрольная точка загрузки',
+                'verbose_name_plural': 'Контрольные точки загрузки',
+                'db_table': 'import_checkpoint',
+            },
+        ),
+    ]
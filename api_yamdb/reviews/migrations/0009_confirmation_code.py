@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_outbox_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfirmationCode',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='confirmation_code', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('code_hash', models.CharField(max_length=64, verbose_name='Хеш кода')),
+                ('expires_at', models.DateTimeField(verbose_name='Действует до')),
+            ],
+            options={
+                'verbose_name': 'Код подтверждения',
+                'verbose_name_plural': 'Коды подтверждения',
+                'db_table': 'confirmation_code',
+            },
+        ),
+    ]
@@ -1,7 +1,13 @@
 import enum
+import hashlib
+import hmac
 
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, get_random_string
 
 from .validators import validate_year
 
@@ -23,6 +29,9 @@ class User(AbstractUser):
                            blank=True,)
     role = models.CharField(
         choices=Role.choices(), default=Role.user.name, max_length=128)
+    # Растет при смене роли или блокировке,
+    # выданные до этого токены перестают приниматься
+    token_version = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -73,6 +82,36 @@ class Genre(models.Model):
         return self.name
 
 
+class TitleQuerySet(models.QuerySet):
+
+    def change_rating(self, score_delta, count_delta=0):
+        """Атомарно сдвигаем накопленные счетчики рейтинга"""
+        return self.update(reviews_count=F('reviews_count') + count_delta,
+                           score_sum=F('score_sum') + score_delta)
+
+    def rebuild_ratings(self, commit=True):
+        """Пересчитываем счетчики рейтинга по отзывам с нуля.
+        Возвращаем список произведений, у которых счетчики разошлись
+        с фактическими данными: (id, было, стало)"""
+        actual = {
+            row['title_id']: (row['count'], row['total'])
+            for row in Review.objects.filter(title__in=self).values(
+                'title_id').annotate(count=Count('id'), total=Sum('score'))}
+        drifted = []
+        for title in self.only('id', 'reviews_count', 'score_sum').iterator():
+            stored = (title.reviews_count, title.score_sum)
+            expected = actual.get(title.pk, (0, 0))
+            if stored != expected:
+                title.reviews_count, title.score_sum = expected
+                drifted.append((title, stored, expected))
+        if commit and drifted:
+            self.model.objects.bulk_update(
+                [title for title, _, _ in drifted],
+                ['reviews_count', 'score_sum'], batch_size=500)
+        return [(title.pk, stored, expected)
+                for title, stored, expected in drifted]
+
+
 class Title(models.Model):
     name = models.TextField(max_length=255,
                             verbose_name='Название произведения')
@@ -87,6 +126,14 @@ class Title(models.Model):
                                  verbose_name='Категория',
                                  blank=True,
                                  null=True)
+    # Денормализованные счетчики отзывов, из которых считается рейтинг.
+    # Обновляются сигналами Review, см. TitleQuerySet.change_rating
+    reviews_count = models.PositiveIntegerField(
+        verbose_name='Количество отзывов', default=0, editable=False)
+    score_sum = models.PositiveIntegerField(
+        verbose_name='Сумма оценок', default=0, editable=False)
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Произведение'
@@ -94,10 +141,17 @@ class Title(models.Model):
         # Кастомизируем название таблицы
         # для совместимости с загрузкой данных из CSV в БД
         db_table = 'titles'
+        indexes = [models.Index(fields=['year'], name='title_year_idx')]
 
     def __str__(self):
         return self.name
 
+    @property
+    def rating(self):
+        if not self.reviews_count:
+            return None
+        return self.score_sum / self.reviews_count
+
 
 class GenreTitle(models.Model):
     genre = models.ForeignKey(Genre, on_delete=models.CASCADE)
@@ -109,6 +163,14 @@ class GenreTitle(models.Model):
         # Кастомизируем название таблицы
         # для совместимости с загрузкой данных из CSV в БД
         db_table = 'genre_title'
+        # Связь читается в обе стороны: жанры произведения
+        # и произведения жанра
+        indexes = [
+            models.Index(fields=['title', 'genre'],
+                         name='genre_title_title_genre_idx'),
+            models.Index(fields=['genre', 'title'],
+                         name='genre_title_genre_title_idx'),
+        ]
 
 
 class Review(models.Model):
@@ -132,6 +194,8 @@ class Review(models.Model):
         # Кастомизируем название таблицы
         # для совместимости с загрузкой данных из CSV в БД
         db_table = 'review'
+        indexes = [models.Index(fields=['title', 'pub_date'],
+                                name='review_title_pub_date_idx')]
         constraints = [models.UniqueConstraint(
             fields=['title', 'author'],
             name='unique author review'
@@ -159,6 +223,110 @@ class Comment(models.Model):
         # Кастомизируем название таблицы
         # для совместимости с загрузкой данных из CSV в БД
         db_table = 'comments'
+        indexes = [models.Index(fields=['review', 'pub_date'],
+                                name='comment_review_pub_date_idx')]
 
     def __str__(self):
         return self.text[:30]
+
+
+class ImportCheckpoint(models.Model):
+    """Прогресс загрузки CSV-файла командой loaddata.
+    Обновляется в одной транзакции с записанной пачкой строк"""
+    file = models.CharField(max_length=255, unique=True)
+    offset = models.BigIntegerField(
+        verbose_name='Смещение в байтах', default=0)
+    rows = models.BigIntegerField(
+        verbose_name='Загружено строк', default=0)
+    file_size = models.BigIntegerField(verbose_name='Размер файла')
+    file_mtime = models.BigIntegerField(verbose_name='Время изменения файла')
+    finished = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name = 'Контрольная точка загрузки'
+        verbose_name_plural = 'Контрольные точки загрузки'
+        db_table = 'import_checkpoint'
+
+    def __str__(self):
+        return f'{self.file}: {self.offset}'
+
+
+class OutboxEmail(models.Model):
+    """Исходящее письмо в очереди на отправку.
+    Письма отправляет команда send_outbox, см. reviews.outbox"""
+    subject = models.CharField(max_length=255, verbose_name='Тема')
+    body = models.TextField(verbose_name='Текст')
+    from_email = models.EmailField(verbose_name='Отправитель')
+    to = models.EmailField(verbose_name='Получатель')
+    created = models.DateTimeField(auto_now_add=True)
+    # до этого момента письмо не берется в отправку:
+    # откладывается при повторе после ошибки и на время отправки
+    next_attempt_at = models.DateTimeField(
+        verbose_name='Следующая попытка', default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток отправки', default=0)
+    last_error = models.TextField(verbose_name='Последняя ошибка', blank=True)
+    sent_at = models.DateTimeField(
+        verbose_name='Отправлено', blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        db_table = 'outbox_email'
+        indexes = [models.Index(fields=['sent_at', 'next_attempt_at'],
+                                name='outbox_pending_idx')]
+
+    def __str__(self):
+        return f'{self.to}: {self.subject}'
+
+
+class ConfirmationCodeManager(models.Manager):
+
+    @staticmethod
+    def make_hash(user_id, code):
+        # короткоживущему шестизначному коду не нужен медленный
+        # хешер паролей: HMAC-SHA256 с ключом проекта не дает подобрать
+        # код по украденной таблице, а проверяется за микросекунды
+        return hmac.new(settings.SECRET_KEY.encode(),
+                        f'{user_id}:{code}'.encode(),
+                        hashlib.sha256).hexdigest()
+
+    def issue(self, user):
+        """Создаем пользователю новый код подтверждения и возвращаем его.
+        В БД хранится только хеш кода"""
+        code = get_random_string(6, allowed_chars='0123456789')
+        self.update_or_create(user=user, defaults={
+            'code_hash': self.make_hash(user.pk, code),
+            'expires_at': timezone.now() + settings.CONFIRMATION_CODE_LIFETIME,
+        })
+        return code
+
+    def check_code(self, user_id, code):
+        """Проверяем код без обращения к паролю пользователя"""
+        confirmation_code = self.filter(user_id=user_id).first()
+        return confirmation_code is not None and confirmation_code.matches(
+            code)
+
+
+class ConfirmationCode(models.Model):
+    """Код подтверждения регистрации, отдельно от пароля пользователя"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='confirmation_code')
+    code_hash = models.CharField(max_length=64, verbose_name='Хеш кода')
+    expires_at = models.DateTimeField(verbose_name='Действует до')
+
+    objects = ConfirmationCodeManager()
+
+    class Meta:
+        verbose_name = 'Код подтверждения'
+        verbose_name_plural = 'Коды подтверждения'
+        db_table = 'confirmation_code'
+
+    def __str__(self):
+        return f'{self.user_id}: до {self.expires_at}'
+
+    def matches(self, code):
+        return self.expires_at > timezone.now() and constant_time_compare(
+            self.code_hash,
+            ConfirmationCode.objects.make_hash(self.user_id, code))
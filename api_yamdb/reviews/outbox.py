@@ -0,0 +1,118 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_ATTEMPTS = 5
+# первая повторная попытка через минуту, дальше интервал удваивается
+RETRY_BASE_DELAY = timedelta(minutes=1)
+RETRY_MAX_DELAY = timedelta(hours=6)
+# на это время письма выпадают из очереди, пока их отправляет обработчик.
+# Если обработчик упал, письма снова станут доступны по истечении срока
+SEND_LEASE = timedelta(minutes=5)
+
+
+def enqueue_email(subject, message, from_email, recipient_list):
+    """Ставим письмо в очередь вместо синхронной отправки.
+    С настройкой EMAIL_OUTBOX_EAGER письмо отправляется сразу после
+    фиксации транзакции (удобно для разработки и тестов)"""
+    emails = [
+        OutboxEmail.objects.create(
+            subject=subject, body=message,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            to=recipient)
+        for recipient in recipient_list]
+    if getattr(settings, 'EMAIL_OUTBOX_EAGER', False):
+        transaction.on_commit(lambda: send_pending(
+            pk__in=[email.pk for email in emails]))
+    return emails
+
+
+def retry_delay(attempts):
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+
+def pending(max_attempts=DEFAULT_MAX_ATTEMPTS):
+    return OutboxEmail.objects.filter(
+        sent_at__isnull=True, attempts__lt=max_attempts)
+
+
+def queue_stats(max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Глубина очереди: ожидающие письма, из них готовые к отправке,
+    и письма, исчерпавшие попытки"""
+    queue = pending(max_attempts)
+    return {
+        'pending': queue.count(),
+        'due': queue.filter(next_attempt_at__lte=timezone.now()).count(),
+        'failed': OutboxEmail.objects.filter(
+            sent_at__isnull=True, attempts__gte=max_attempts).count(),
+    }
+
+
+def claim_batch(batch_size, max_attempts, **filters):
+    """Забираем пачку готовых писем, откладывая их на время отправки,
+    чтобы параллельные обработчики не отправили их повторно"""
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            pending(max_attempts).filter(next_attempt_at__lte=now, **filters)
+            .select_for_update(skip_locked=True)
+            .order_by('next_attempt_at', 'pk')[:batch_size])
+        OutboxEmail.objects.filter(pk__in=[email.pk for email in emails]
+                                   ).update(next_attempt_at=now + SEND_LEASE)
+    return emails
+
+
+def send_batch(emails):
+    """Отправляем пачку писем через одно соединение с почтовым сервером.
+    Возвращаем количество отправленных и отложенных на повтор писем"""
+    sent, failed = [], []
+
+    def fail(email, error):
+        email.last_error = f'{type(error).__name__}: {error}'
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+        failed.append(email)
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as error:
+        for email in emails:
+            email.attempts += 1
+            fail(email, error)
+        emails = []
+    try:
+        for email in emails:
+            email.attempts += 1
+            try:
+                EmailMessage(email.subject, email.body, email.from_email,
+                             [email.to], connection=connection).send()
+            except Exception as error:
+                fail(email, error)
+            else:
+                email.sent_at = timezone.now()
+                sent.append(email)
+    finally:
+        connection.close()
+    OutboxEmail.objects.bulk_update(sent, ['attempts', 'sent_at'])
+    OutboxEmail.objects.bulk_update(
+        failed, ['attempts', 'last_error', 'next_attempt_at'])
+    return len(sent), len(failed)
+
+
+def send_pending(batch_size=DEFAULT_BATCH_SIZE,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, **filters):
+    """Отправляем все готовые письма пачками"""
+    sent = failed = 0
+    emails = claim_batch(batch_size, max_attempts, **filters)
+    while emails:
+        batch_sent, batch_failed = send_batch(emails)
+        sent += batch_sent
+        failed += batch_failed
+        emails = claim_batch(batch_size, max_attempts, **filters)
+    return sent, failed
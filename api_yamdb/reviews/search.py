@@ -0,0 +1,79 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+class BaseTitleSearchBackend:
+    """Бэкенд полнотекстового поиска по произведениям.
+    Поисковый индекс должен соответствовать таблице произведений:
+    бэкенд получает вызовы update/delete при каждой записи Title
+    и может быть пересобран целиком методом rebuild"""
+
+    def search(self, queryset, query):
+        """Возвращаем queryset, отфильтрованный по запросу
+        и упорядоченный по релевантности"""
+        raise NotImplementedError
+
+    def update(self, title):
+        pass
+
+    def delete(self, title):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class SubstringSearchBackend(BaseTitleSearchBackend):
+    """Поиск подстрокой по названию без индекса. Работает на любой БД"""
+
+    def search(self, queryset, query):
+        return queryset.filter(name__icontains=query)
+
+
+class SQLiteFTS5Backend(BaseTitleSearchBackend):
+    """Поиск по FTS5-индексу titles_fts в SQLite.
+    Индекс обновляется триггерами БД (миграция 0006), поэтому
+    остается согласованным и при массовой загрузке в обход ORM"""
+    table = 'titles_fts'
+
+    @staticmethod
+    def to_match_expression(query):
+        # каждое слово запроса ищем как префикс, все слова обязательны
+        return ' '.join(f'"{token}"*' for token in TOKEN_RE.findall(query))
+
+    def search(self, queryset, query):
+        expression = self.to_match_expression(query)
+        if not expression:
+            return queryset.none()
+        pk_column = '{}.{}'.format(
+            connection.ops.quote_name(queryset.model._meta.db_table),
+            connection.ops.quote_name(queryset.model._meta.pk.column))
+        # совпадения отбираются подзапросом внутри того же SQL,
+        # поэтому остальные фильтры и пагинация видят их все.
+        # RawSQL в pk__in Django 2.2 оборачивает в лишние скобки,
+        # и SQLite читает такой подзапрос как скалярный
+        matches = (f'{pk_column} IN (SELECT rowid FROM {self.table} '
+                   f'WHERE {self.table} MATCH %s)')
+        # rank у FTS5 тем меньше, чем запись релевантнее
+        rank = RawSQL(
+            f'SELECT rank FROM {self.table} WHERE {self.table} MATCH %s '
+            f'AND rowid = {pk_column}', [expression],
+            output_field=FloatField())
+        return queryset.extra(where=[matches], params=[expression]).annotate(
+            search_rank=rank).order_by('search_rank', 'pk')
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {self.table}({self.table}) VALUES ('rebuild')")
+
+
+def get_search_backend():
+    return import_string(settings.TITLE_SEARCH_BACKEND)()
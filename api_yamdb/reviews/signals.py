@@ -0,0 +1,50 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Review, Title
+from .search import get_search_backend
+
+
+@receiver(post_save, sender=Title)
+def update_search_index(sender, instance, **kwargs):
+    get_search_backend().update(instance)
+
+
+@receiver(post_delete, sender=Title)
+def delete_from_search_index(sender, instance, **kwargs):
+    get_search_backend().delete(instance)
+
+
+# Счетчики рейтинга обновляются сигналами, а не во вьюсете,
+# чтобы учитывать и каскадные удаления, и правки через админку
+
+@receiver(pre_save, sender=Review)
+def remember_stored_score(sender, instance, **kwargs):
+    instance._stored_score = None
+    if instance.pk is not None:
+        instance._stored_score = Review.objects.filter(
+            pk=instance.pk).values_list('title_id', 'score').first()
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, **kwargs):
+    stored = getattr(instance, '_stored_score', None)
+    if created or stored is None:
+        Title.objects.filter(pk=instance.title_id).change_rating(
+            instance.score, count_delta=1)
+        return
+    title_id, score = stored
+    if title_id != instance.title_id:
+        Title.objects.filter(pk=title_id).change_rating(
+            -score, count_delta=-1)
+        Title.objects.filter(pk=instance.title_id).change_rating(
+            instance.score, count_delta=1)
+    elif score != instance.score:
+        Title.objects.filter(pk=title_id).change_rating(
+            instance.score - score)
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    Title.objects.filter(pk=instance.title_id).change_rating(
+        -instance.score, count_delta=-1)
@@ -113,3 +113,15 @@ def create_comments(admin_client, admin):
     result.append({'id': create_comment(client_moderator, titles[0]["id"], reviews[0]["id"], 'qwerty321'),
                    'author': moderator.username, 'text': 'qwerty321'})
     return result, reviews, titles, user, moderator
+
+
+def create_more_titles(count):
+    from reviews.models import Category, Genre, GenreTitle, Title
+
+    category = Category.objects.first()
+    genres = list(Genre.objects.all())
+    for i in range(count):
+        title = Title.objects.create(name=f'Произведение {i}', year=2000,
+                                     description='', category=category)
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title=title, genre=genre) for genre in genres)
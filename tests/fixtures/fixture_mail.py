@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def eager_outbox(settings):
+    # письма из очереди отправляются сразу, чтобы попадать в mail.outbox
+    settings.EMAIL_OUTBOX_EAGER = True
@@ -0,0 +1,65 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from .common import create_reviews
+
+
+class Test08RatingCounters:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_rating_after_review_delete(self, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        response = admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/')
+        assert response.status_code == 204
+        data = admin_client.get(f'/api/v1/titles/{titles[0]["id"]}/').json()
+        assert data.get('rating') == 3, (
+            'Проверьте, что после удаления отзыва рейтинг произведения пересчитывается'
+        )
+        for review in reviews[1:]:
+            admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/reviews/{review["id"]}/')
+        data = admin_client.get(f'/api/v1/titles/{titles[0]["id"]}/').json()
+        assert data.get('rating') is None, (
+            'Проверьте, что после удаления всех отзывов `rating` равен `None`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_rebuild_ratings_command(self, admin_client, admin):
+        from reviews.models import Title
+
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        Title.objects.filter(pk=titles[0]['id']).update(reviews_count=1, score_sum=1)
+
+        out = StringIO()
+        call_command('rebuild_ratings', '--dry-run', stdout=out)
+        assert f'Произведение {titles[0]["id"]}' in out.getvalue(), (
+            'Проверьте, что команда `rebuild_ratings` сообщает о расхождениях счетчиков'
+        )
+        assert Title.objects.get(pk=titles[0]['id']).reviews_count == 1
+
+        call_command('rebuild_ratings', stdout=StringIO())
+        data = admin_client.get(f'/api/v1/titles/{titles[0]["id"]}/').json()
+        assert data.get('rating') == 4, (
+            'Проверьте, что команда `rebuild_ratings` восстанавливает счетчики рейтинга'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_rating_after_author_delete(self, admin_client, admin):
+        from reviews.models import Review
+
+        _, titles, user, moderator = create_reviews(admin_client, admin)
+        response = admin_client.delete(f'/api/v1/users/{moderator.username}/')
+        assert response.status_code == 204
+        data = admin_client.get(f'/api/v1/titles/{titles[0]["id"]}/').json()
+        assert data.get('rating') == 4, (
+            'Проверьте, что при удалении автора его отзывы вычитаются из рейтинга произведения'
+        )
+
+        review = Review.objects.get(author=user)
+        review.score = 9
+        review.save()
+        data = admin_client.get(f'/api/v1/titles/{titles[0]["id"]}/').json()
+        assert data.get('rating') == 7, (
+            'Проверьте, что рейтинг пересчитывается и при изменении отзыва в обход API'
+        )
@@ -0,0 +1,104 @@
+import pytest
+
+from .common import create_comments, create_more_titles, create_titles
+
+
+class Test09QueryCount:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_list_queries(self, client, admin_client, django_assert_num_queries):
+        create_titles(admin_client)
+        with django_assert_num_queries(3):
+            response = client.get('/api/v1/titles/?limit=100')
+        assert len(response.json()['results']) == 2
+
+        create_more_titles(20)
+        with django_assert_num_queries(3):
+            response = client.get('/api/v1/titles/?limit=100')
+        assert len(response.json()['results']) == 22, (
+            'Проверьте, что количество запросов к БД при GET запросе `/api/v1/titles/` '
+            'не зависит от количества произведений на странице'
+        )
+        assert all(title['category'] and title['genre'] for title in response.json()['results'])
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_titles_detail_queries(self, client, admin_client, django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        with django_assert_num_queries(2):
+            response = client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        data = response.json()
+        assert data['category']['slug'] == titles[0]['category']
+        assert sorted(genre['slug'] for genre in data['genre']) == sorted(titles[0]['genre'])
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_titles_filtered_list_queries(self, client, admin_client, django_assert_num_queries):
+        create_titles(admin_client)
+        create_more_titles(10)
+        with django_assert_num_queries(4):
+            response = client.get('/api/v1/titles/?genre=horror&limit=100')
+        assert len(response.json()['results']) == 11
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_review_create_title_lookups(self, admin_client):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        titles, _, _ = create_titles(admin_client)
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(f'/api/v1/titles/{titles[0]["id"]}/reviews/',
+                                         data={'text': 'Отзыв', 'score': 5})
+        assert response.status_code == 201
+        title_selects = [query['sql'] for query in context.captured_queries
+                         if query['sql'].startswith('SELECT') and 'FROM "titles"' in query['sql']]
+        assert len(title_selects) == 1, (
+            'Проверьте, что при POST запросе `/api/v1/titles/{title_id}/reviews/` '
+            'произведение запрашивается из БД один раз'
+        )
+
+        response = admin_client.post('/api/v1/titles/100500/reviews/', data={'text': 'Отзыв', 'score': 5})
+        assert response.status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_comments_list_queries(self, client, admin_client, admin, django_assert_num_queries):
+        from reviews.models import Comment, User
+
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/'
+        with django_assert_num_queries(3):
+            response = client.get(url)
+        assert response.json()['count'] == 3
+
+        for i in range(10):
+            author = User.objects.create(username=f'commenter{i}', email=f'commenter{i}@yamdb.fake')
+            Comment.objects.create(review_id=reviews[0]['id'], author=author, text='Комментарий')
+        with django_assert_num_queries(3):
+            response = client.get(url)
+        data = response.json()
+        assert data['count'] == 13
+        assert {comment['author'] for comment in data['results']} >= {'TestAdmin'}, (
+            'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/reviews/{review_id}/comments/` '
+            'возвращается `username` автора комментария'
+        )
+
+        with django_assert_num_queries(1):
+            response = client.get(f'/api/v1/titles/{titles[1]["id"]}/reviews/{reviews[0]["id"]}/comments/')
+        assert response.status_code == 404, (
+            'Проверьте, что при GET запросе комментариев к отзыву другого произведения возвращается статус 404'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_reviews_list_queries(self, client, admin_client, django_assert_num_queries):
+        from reviews.models import Review, User
+
+        titles, _, _ = create_titles(admin_client)
+        for i in range(15):
+            author = User.objects.create(username=f'reviewer{i}', email=f'reviewer{i}@yamdb.fake')
+            Review.objects.create(title_id=titles[0]['id'], author=author, text='Отзыв', score=5)
+        with django_assert_num_queries(3):
+            response = client.get(f'/api/v1/titles/{titles[0]["id"]}/reviews/?limit=100')
+        data = response.json()
+        assert len(data['results']) == 15
+        assert {review['author'] for review in data['results']} == {f'reviewer{i}' for i in range(15)}, (
+            'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/reviews/` '
+            'возвращается `username` автора отзыва'
+        )
@@ -0,0 +1,99 @@
+import pytest
+
+from .common import create_more_titles, create_reviews, create_titles
+
+
+class Test10CursorPagination:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_cursor(self, client, admin_client):
+        create_titles(admin_client)
+        create_more_titles(5)
+        response = client.get('/api/v1/titles/?cursor=&limit=3')
+        assert response.status_code == 200
+        data = response.json()
+        assert 'count' not in data, (
+            'Проверьте, что при курсорной пагинации `/api/v1/titles/?cursor=` '
+            'не выполняется подсчет общего количества объектов'
+        )
+        assert data['previous'] is None and data['next'], (
+            'Проверьте, что при курсорной пагинации возвращаются ссылки `next` и `previous`'
+        )
+        seen = [title['id'] for title in data['results']]
+        while data['next']:
+            data = client.get(data['next']).json()
+            seen.extend(title['id'] for title in data['results'])
+        assert seen == sorted(seen, reverse=True) and len(seen) == 7, (
+            'Проверьте, что курсорная пагинация по `/api/v1/titles/` возвращает '
+            'все объекты в стабильном порядке без пропусков и повторов'
+        )
+
+        response = client.get('/api/v1/titles/?limit=3&offset=3')
+        data = response.json()
+        assert data['count'] == 7 and len(data['results']) == 3, (
+            'Проверьте, что пагинация limit/offset продолжает работать'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reviews_and_comments_cursor(self, client, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/reviews/?cursor=&limit=2')
+        data = response.json()
+        assert len(data['results']) == 2 and data['next']
+        data = client.get(data['next']).json()
+        assert len(data['results']) == 1 and data['next'] is None
+
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/?cursor='
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.json()['results'] == []
+
+
+class Test10CachedCount:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_count_is_cached_until_write(self, client, admin_client, django_assert_num_queries):
+        create_titles(admin_client)
+        response = client.get('/api/v1/titles/?genre=horror')
+        data = response.json()
+        assert data['count'] == 1 and data['count_exact'] is True, (
+            'Проверьте, что пагинация сообщает в поле `count_exact`, точное ли значение `count`'
+        )
+        with django_assert_num_queries(3):
+            response = client.get('/api/v1/titles/?genre=horror&offset=0')
+        assert response.json()['count'] == 1
+
+        create_more_titles(2)
+        response = client.get('/api/v1/titles/?genre=horror')
+        assert response.json()['count'] == 3, (
+            'Проверьте, что закешированное количество сбрасывается при изменении произведений'
+        )
+
+        response = client.get('/api/v1/categories/')
+        assert response.json()['count'] == 2
+        admin_client.delete('/api/v1/categories/films/')
+        response = client.get('/api/v1/categories/')
+        assert response.json()['count'] == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_estimated_count(self, client, admin_client):
+        from django.db import connection
+
+        create_titles(admin_client)
+        create_more_titles(3)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        try:
+            data = client.get('/api/v1/titles/?count=estimated').json()
+        finally:
+            # статистика по крошечным тестовым таблицам
+            # не должна влиять на планы запросов в других тестах
+            with connection.cursor() as cursor:
+                cursor.execute('DELETE FROM sqlite_stat1')
+                cursor.execute('ANALYZE sqlite_master')
+        assert data['count'] == 5 and data['count_exact'] is False, (
+            'Проверьте, что при `?count=estimated` для таблицы без фильтров '
+            'возвращается оценка количества и `count_exact` равен `False`'
+        )
+        data = client.get('/api/v1/titles/?count=estimated&year=2020').json()
+        assert data['count'] == 1 and data['count_exact'] is True
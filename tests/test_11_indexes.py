@@ -0,0 +1,24 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from .common import create_comments
+
+
+class Test11Indexes:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_explain_queries(self, admin_client, admin):
+        create_comments(admin_client, admin)
+        out = StringIO()
+        call_command('explain_queries', stdout=out)
+        output = out.getvalue()
+        assert 'Остальные запросы используют индексы' in output, (
+            'Проверьте, что горячие запросы API не выполняют полный проход по таблицам'
+        )
+        assert 'Все запросы используют индексы' not in output
+        for name in ('страница произведений', 'произведения по подстроке названия'):
+            assert f'{name}: полный проход допустим' in output, (
+                'Проверьте, что допустимые полные проходы перечислены в отчете с причиной'
+            )
@@ -0,0 +1,101 @@
+import pytest
+
+from .common import create_titles
+
+
+class Test12TitleSearch:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_search_titles(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        response = client.get('/api/v1/titles/?q=поворот')
+        assert response.status_code == 200
+        data = response.json()
+        assert [title['id'] for title in data['results']] == [titles[0]['id']], (
+            'Проверьте, что GET запрос `/api/v1/titles/?q=` ищет произведения по названию'
+        )
+        data = client.get('/api/v1/titles/?q=драма').json()
+        assert [title['id'] for title in data['results']] == [titles[1]['id']], (
+            'Проверьте, что GET запрос `/api/v1/titles/?q=` ищет произведения по описанию'
+        )
+        data = client.get('/api/v1/titles/?q=нет такого').json()
+        assert data['count'] == 0 and data['results'] == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_search_index_follows_writes(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        admin_client.patch(f'/api/v1/titles/{titles[0]["id"]}/', data={'name': 'Разворот'})
+        assert client.get('/api/v1/titles/?q=поворот').json()['count'] == 0
+        assert client.get('/api/v1/titles/?q=разворот').json()['count'] == 1, (
+            'Проверьте, что поисковый индекс обновляется при изменении произведения'
+        )
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert client.get('/api/v1/titles/?q=разворот').json()['count'] == 0, (
+            'Проверьте, что поисковый индекс обновляется при удалении произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_search_relevance(self, client, admin_client):
+        from reviews.models import Title
+
+        Title.objects.create(name='Сад', year=2000, description='Вишневый сад, сад и снова сад')
+        Title.objects.create(name='Вишневый сад', year=2001, description='Пьеса')
+        Title.objects.create(name='Лес', year=2002, description='Про сад упоминается однажды')
+        data = client.get('/api/v1/titles/?q=сад').json()
+        assert [title['name'] for title in data['results']][0] == 'Сад', (
+            'Проверьте, что результаты `?q=` упорядочены по релевантности'
+        )
+        assert data['count'] == 3
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_search_with_other_filters(self, client):
+        from reviews.models import Title
+
+        Title.objects.bulk_create(
+            Title(name=f'Фильм {number}', year=2000) for number in range(600))
+        Title.objects.create(name='Старый фильм', year=1950)
+        data = client.get('/api/v1/titles/?q=фильм&year=1950').json()
+        assert [title['name'] for title in data['results']] == ['Старый фильм'], (
+            'Проверьте, что `?q=` сочетается с другими фильтрами '
+            'без ограничения числа найденных произведений'
+        )
+        data = client.get('/api/v1/titles/?q=фильм').json()
+        assert data['count'] == 601, (
+            'Проверьте, что `count` для `?q=` учитывает все совпадения'
+        )
+
+
+class Test12TitleFilters:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_exact_and_multi_value_filters(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        data = client.get('/api/v1/titles/?genre=horror,comedy,drama').json()
+        assert data['count'] == 2 and len(data['results']) == 2, (
+            'Проверьте, что `?genre=` принимает несколько slug через запятую '
+            'и не возвращает дубликаты произведений'
+        )
+        data = client.get('/api/v1/titles/?genre=drama,horror').json()
+        assert data['count'] == 2
+        data = client.get('/api/v1/titles/?genre=dram').json()
+        assert data['count'] == 0, (
+            'Проверьте, что `?genre=` ищет точное совпадение slug'
+        )
+        data = client.get('/api/v1/titles/?category=films,books').json()
+        assert data['count'] == 2
+        data = client.get('/api/v1/titles/?category=film').json()
+        assert data['count'] == 0, (
+            'Проверьте, что `?category=` ищет точное совпадение slug'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_substring_filters(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        data = client.get('/api/v1/titles/?genre_contains=o').json()
+        assert data['count'] == 1 and len(data['results']) == 1, (
+            'Проверьте, что `?genre_contains=` ищет подстроку в slug без дубликатов'
+        )
+        data = client.get('/api/v1/titles/?genre_contains=d').json()
+        assert data['count'] == 2
+        data = client.get('/api/v1/titles/?category_contains=film').json()
+        assert [title['id'] for title in data['results']] == [titles[0]['id']]
@@ -0,0 +1,199 @@
+import shutil
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from .conftest import MANAGE_PATH
+
+DATA_PATH = f'{MANAGE_PATH}/static/data'
+
+
+@pytest.fixture
+def csv_dir(tmp_path, monkeypatch):
+    from reviews.management.commands import loaddata
+
+    shutil.copytree(DATA_PATH, tmp_path, dirs_exist_ok=True)
+    monkeypatch.setattr(loaddata, 'CSV_DATA_PATH', str(tmp_path))
+    return tmp_path
+
+
+class Test13LoadData:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_bulk_load(self, csv_dir):
+        from reviews.models import Comment, GenreTitle, Review, Title, User
+
+        out = StringIO()
+        call_command('loaddata', '--bulk', '--chunk-size', '10', stdout=out)
+        assert 'строк/с' in out.getvalue(), (
+            'Проверьте, что `loaddata --bulk` сообщает скорость загрузки каждого файла'
+        )
+        assert (Title.objects.count(), GenreTitle.objects.count(), User.objects.count(),
+                Review.objects.count(), Comment.objects.count()) == (32, 42, 5, 72, 3)
+        title = Title.objects.get(pk=1)
+        assert title.reviews_count == title.reviews.count(), (
+            'Проверьте, что после загрузки пересчитываются счетчики рейтинга'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_parallel_load(self, csv_dir):
+        from reviews.management.commands.loaddata import LOADING_ORDER, get_dependency_stages
+        from reviews.models import Comment, GenreTitle, Review, Title, User
+
+        stages = get_dependency_stages(LOADING_ORDER)
+        assert stages[0] == ['category.csv', 'genre.csv', 'users.csv'], (
+            'Проверьте, что независимые файлы загружаются на одном этапе'
+        )
+        assert stages.index(['comments.csv']) > stages.index(['genre_title.csv', 'review.csv'])
+
+        call_command('loaddata', '--workers', '2', '--chunk-size', '10', stdout=StringIO())
+        assert (Title.objects.count(), GenreTitle.objects.count(), User.objects.count(),
+                Review.objects.count(), Comment.objects.count()) == (32, 42, 5, 72, 3), (
+            'Проверьте, что `loaddata --workers` загружает все данные'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_bulk_load_integrity(self, csv_dir):
+        from reviews.models import Comment, Title
+
+        with open(csv_dir / 'comments.csv', 'a', encoding='UTF-8') as file:
+            file.write('\n100,100500,Комментарий к несуществующему отзыву,100,2020-01-13T23:20:02.422Z\n')
+        with pytest.raises(CommandError, match='comments.csv'):
+            call_command('loaddata', '--bulk', stdout=StringIO())
+        assert not Comment.objects.filter(pk=100).exists(), (
+            'Проверьте, что строки с несуществующими ссылками не остаются в БД'
+        )
+        title = Title.objects.get(pk=1)
+        assert title.reviews_count == title.reviews.count() > 0, (
+            'Проверьте, что счетчики рейтинга пересчитываются и после ошибки загрузки'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_resume_after_failure(self, csv_dir, monkeypatch):
+        from reviews.management.commands.loaddata import Command
+        from reviews.models import Comment, ImportCheckpoint, Review, Title
+
+        write_chunk = Command.write_chunk
+        calls = []
+
+        def failing_write_chunk(file, rows, offset, upsert):
+            if file == 'review.csv' and len(calls) == 2:
+                raise RuntimeError('Сбой посреди загрузки')
+            if file == 'review.csv':
+                calls.append(offset)
+            write_chunk(file, rows, offset, upsert)
+
+        monkeypatch.setattr(Command, 'write_chunk', staticmethod(failing_write_chunk))
+        with pytest.raises(RuntimeError):
+            call_command('loaddata', '--bulk', '--chunk-size', '10', stdout=StringIO())
+        assert Review.objects.count() == 20
+        checkpoint = ImportCheckpoint.objects.get(file='review.csv')
+        assert (checkpoint.offset, checkpoint.rows, checkpoint.finished) == (calls[-1], 20, False), (
+            'Проверьте, что `loaddata` сохраняет смещение последней записанной пачки'
+        )
+
+        monkeypatch.setattr(Command, 'write_chunk', staticmethod(write_chunk))
+        out = StringIO()
+        call_command('loaddata', '--resume', '--chunk-size', '10', stdout=out)
+        assert 'titles.csv уже загружен' in out.getvalue()
+        assert (Title.objects.count(), Review.objects.count(), Comment.objects.count()) == (32, 72, 3), (
+            'Проверьте, что `loaddata --resume` продолжает загрузку с контрольной точки без дубликатов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_upsert(self, csv_dir):
+        from reviews.models import Genre
+
+        call_command('loaddata', '--bulk', stdout=StringIO())
+        genres = (csv_dir / 'genre.csv').read_text(encoding='UTF-8')
+        (csv_dir / 'genre.csv').write_text(genres.replace('1,Драма,drama', '1,Новая драма,drama'),
+                                           encoding='UTF-8')
+        call_command('loaddata', '--upsert', stdout=StringIO())
+        assert Genre.objects.count() == 15
+        assert Genre.objects.get(pk=1).name == 'Новая драма', (
+            'Проверьте, что `loaddata --upsert` обновляет уже загруженные строки по `id`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_dumpcsv_round_trip(self, csv_dir, tmp_path_factory, monkeypatch):
+        from reviews.management.commands import loaddata
+        from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title, User
+
+        call_command('loaddata', '--bulk', stdout=StringIO())
+        expected = (Title.objects.count(), GenreTitle.objects.count(), User.objects.count(),
+                    Review.objects.count(), Comment.objects.count())
+
+        dump_dir = tmp_path_factory.mktemp('dump')
+        out = StringIO()
+        call_command('dumpcsv', '--output-dir', str(dump_dir), '--workers', '3', stdout=out)
+        assert 'строк/с' in out.getvalue(), (
+            'Проверьте, что `dumpcsv` сообщает скорость выгрузки каждого файла'
+        )
+        for model in (Comment, Review, GenreTitle, Title, Genre, Category, User):
+            model.objects.all().delete()
+
+        monkeypatch.setattr(loaddata, 'CSV_DATA_PATH', str(dump_dir))
+        call_command('loaddata', '--bulk', stdout=StringIO())
+        assert (Title.objects.count(), GenreTitle.objects.count(), User.objects.count(),
+                Review.objects.count(), Comment.objects.count()) == expected, (
+            'Проверьте, что файлы `dumpcsv` загружаются обратно командой `loaddata`'
+        )
+
+    def test_07_dumpcsv_unknown_file(self):
+        with pytest.raises(CommandError, match='unknown.csv'):
+            call_command('dumpcsv', 'unknown.csv', stdout=StringIO())
+
+    @pytest.mark.django_db(transaction=True)
+    def test_08_genre_title_link_table(self, csv_dir):
+        from reviews.models import Genre, GenreTitle
+
+        call_command('loaddata', stdout=StringIO())
+        assert GenreTitle.objects.count() == 42, (
+            'Проверьте, что `loaddata` загружает все связи произведений и жанров'
+        )
+        genre = Genre.objects.get(pk=1)
+        assert genre.title_set.count() > 1, (
+            'Проверьте, что жанр может быть связан с несколькими произведениями'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_09_genre_title_missing_reference(self, csv_dir):
+        from reviews.models import GenreTitle
+
+        with open(csv_dir / 'genre_title.csv', 'a', encoding='UTF-8') as file:
+            file.write('\n100,1,100500\n')
+        with pytest.raises(CommandError, match='100500'):
+            call_command('loaddata', stdout=StringIO())
+        assert not GenreTitle.objects.exists(), (
+            'Проверьте, что связи с несуществующим жанром не загружаются'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_10_bulk_load_twice(self, csv_dir):
+        call_command('loaddata', '--bulk', stdout=StringIO())
+        with pytest.raises(CommandError, match='--upsert'):
+            call_command('loaddata', '--bulk', stdout=StringIO())
+
+    @pytest.mark.django_db(transaction=True)
+    def test_11_resume_after_integrity_failure(self, csv_dir):
+        from reviews.models import Comment, ImportCheckpoint, Review, Title, User
+
+        with open(csv_dir / 'comments.csv', 'a', encoding='UTF-8') as file:
+            file.write('\n100,100500,Комментарий к несуществующему отзыву,100,2020-01-13T23:20:02.422Z\n')
+        with pytest.raises(CommandError, match='--resume'):
+            call_command('loaddata', '--bulk', '--chunk-size', '2', stdout=StringIO())
+        checkpoint = ImportCheckpoint.objects.get(file='comments.csv')
+        assert (checkpoint.rows, checkpoint.finished) == (2, False), (
+            'Проверьте, что контрольная точка не сдвигается за строки, не прошедшие проверку ссылок'
+        )
+        assert Comment.objects.count() == 2
+
+        title = Title.objects.create(name='Позднее произведение', year=2000)
+        Review.objects.create(pk=100500, title=title, author=User.objects.get(pk=100),
+                              text='Поздний отзыв', score=5)
+        call_command('loaddata', '--resume', '--chunk-size', '2', stdout=StringIO())
+        assert Comment.objects.count() == 4, (
+            'Проверьте, что `loaddata --resume` продолжает загрузку после ошибки ссылочной целостности'
+        )
+        assert ImportCheckpoint.objects.get(file='comments.csv').finished
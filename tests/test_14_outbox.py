@@ -0,0 +1,83 @@
+from io import StringIO
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+
+
+class Test14Outbox:
+    url_signup = '/api/v1/auth/signup/'
+
+    @pytest.fixture(autouse=True)
+    def queued_outbox(self, settings):
+        settings.EMAIL_OUTBOX_EAGER = False
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_enqueues_email(self, client):
+        from reviews.models import OutboxEmail
+
+        response = client.post(self.url_signup, data={
+            'email': 'queued@yamdb.fake', 'username': 'queued'})
+        assert response.status_code == 200
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что при регистрации письмо не отправляется в запросе, '
+            'а ставится в очередь'
+        )
+        assert OutboxEmail.objects.filter(to='queued@yamdb.fake', sent_at__isnull=True).exists()
+
+        out = StringIO()
+        call_command('send_outbox', stdout=out)
+        assert len(mail.outbox) == 1 and mail.outbox[0].to == ['queued@yamdb.fake'], (
+            'Проверьте, что команда `send_outbox` отправляет письма из очереди'
+        )
+        assert 'В очереди писем: 0' in out.getvalue()
+        assert not OutboxEmail.objects.filter(sent_at__isnull=True).exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_batch_uses_one_connection(self, monkeypatch):
+        from reviews import outbox
+
+        for i in range(5):
+            outbox.enqueue_email('Тема', 'Текст', None, [f'user{i}@yamdb.fake'])
+        connections = []
+        get_connection = outbox.get_connection
+
+        def counting_get_connection(**kwargs):
+            connections.append(get_connection(**kwargs))
+            return connections[-1]
+
+        monkeypatch.setattr(outbox, 'get_connection', counting_get_connection)
+        assert outbox.send_pending(batch_size=10) == (5, 0)
+        assert len(connections) == 1, (
+            'Проверьте, что пачка писем отправляется через одно соединение'
+        )
+        assert len(mail.outbox) == 5
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_retry_with_backoff(self, monkeypatch):
+        from django.core.mail import EmailMessage
+        from django.utils import timezone
+
+        from reviews import outbox
+        from reviews.models import OutboxEmail
+
+        def failing_send(self, fail_silently=False):
+            raise ConnectionError('relay is down')
+
+        outbox.enqueue_email('Тема', 'Текст', None, ['retry@yamdb.fake'])
+        monkeypatch.setattr(EmailMessage, 'send', failing_send)
+        assert outbox.send_pending() == (0, 1)
+
+        email = OutboxEmail.objects.get(to='retry@yamdb.fake')
+        assert email.attempts == 1 and 'relay is down' in email.last_error
+        assert email.next_attempt_at > timezone.now(), (
+            'Проверьте, что после ошибки отправка откладывается'
+        )
+        assert outbox.queue_stats() == {'pending': 1, 'due': 0, 'failed': 0}
+        assert outbox.retry_delay(3) == outbox.retry_delay(1) * 4
+
+        monkeypatch.undo()
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        assert outbox.send_pending() == (1, 0), (
+            'Проверьте, что отложенное письмо отправляется при следующей попытке'
+        )
@@ -0,0 +1,109 @@
+import re
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+
+
+class Test15ConfirmationCode:
+    url_signup = '/api/v1/auth/signup/'
+    url_token = '/api/v1/auth/token/'
+
+    def signup(self, client, username='coded'):
+        response = client.post(self.url_signup, data={
+            'email': f'{username}@yamdb.fake', 'username': username})
+        assert response.status_code == 200
+        return re.search(r'\d{6}', mail.outbox[-1].body).group()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_code_stored_as_keyed_hash(self, client, django_user_model):
+        from reviews.models import ConfirmationCode
+
+        code = self.signup(client)
+        user = django_user_model.objects.get(username='coded')
+        assert not user.has_usable_password(), (
+            'Проверьте, что код подтверждения не сохраняется в поле пароля'
+        )
+        stored = ConfirmationCode.objects.get(user=user)
+        assert code not in stored.code_hash
+        assert ConfirmationCode.objects.check_code(user.pk, code)
+        assert not ConfirmationCode.objects.check_code(user.pk, '000000' if code != '000000' else '111111')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_expired_code_rejected(self, client, django_user_model):
+        from django.utils import timezone
+
+        from reviews.models import ConfirmationCode
+
+        code = self.signup(client)
+        user = django_user_model.objects.get(username='coded')
+        ConfirmationCode.objects.filter(user=user).update(
+            expires_at=timezone.now() - timedelta(seconds=1))
+        assert not ConfirmationCode.objects.check_code(user.pk, code), (
+            'Проверьте, что просроченный код подтверждения не принимается'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_signup_writes_user_once(self, client, settings):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        settings.EMAIL_OUTBOX_EAGER = False
+        with CaptureQueriesContext(connection) as context:
+            client.post(self.url_signup, data={
+                'email': 'once@yamdb.fake', 'username': 'once'})
+        writes = [query['sql'].split('(')[0].strip() for query in context.captured_queries
+                  if query['sql'].startswith(('INSERT', 'UPDATE'))]
+        assert writes == ['INSERT INTO "users"', 'INSERT INTO "confirmation_code"',
+                          'INSERT INTO "outbox_email"'], (
+            'Проверьте, что при регистрации пользователь и код подтверждения '
+            'записываются в БД по одному разу'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_token_by_code(self, client):
+        code = self.signup(client)
+        response = client.post(self.url_token, data={'username': 'coded', 'confirmation_code': code})
+        assert response.status_code == 200 and 'token' in response.json(), (
+            'Проверьте, что по коду подтверждения выдается токен'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_token_single_query(self, client, django_assert_num_queries):
+        code = self.signup(client)
+        with django_assert_num_queries(1):
+            response = client.post(self.url_token, data={'username': 'coded', 'confirmation_code': code})
+        assert response.status_code == 200, (
+            'Проверьте, что пользователь и код подтверждения читаются одним запросом'
+        )
+        response = client.get('/api/v1/users/me/',
+                              HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]}')
+        assert response.status_code == 200 and response.json()['username'] == 'coded', (
+            'Проверьте, что выданный токен принимается API'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_signup_again_reissues_code(self, client, django_user_model):
+        from django.utils import timezone
+
+        from reviews.models import ConfirmationCode
+
+        old_code = self.signup(client)
+        user = django_user_model.objects.get(username='coded')
+        ConfirmationCode.objects.filter(user=user).update(
+            expires_at=timezone.now() - timedelta(seconds=1))
+        code = self.signup(client)
+        assert django_user_model.objects.filter(username='coded').count() == 1
+        response = client.post(self.url_token, data={'username': 'coded', 'confirmation_code': code})
+        assert response.status_code == 200 and 'token' in response.json(), (
+            'Проверьте, что повторная регистрация с теми же username и email '
+            'выдает новый действующий код подтверждения'
+        )
+        if old_code != code:
+            assert not ConfirmationCode.objects.check_code(user.pk, old_code)
+
+        response = client.post(self.url_signup, data={
+            'email': 'other@yamdb.fake', 'username': 'coded'})
+        assert response.status_code == 400, (
+            'Проверьте, что занятый username с другим email по-прежнему отклоняется'
+        )
@@ -0,0 +1,102 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+def claims_client(user):
+    from api.authentication import ClaimsAccessToken
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {ClaimsAccessToken.for_user(user)}')
+    return client
+
+
+def users_queries(context):
+    return [query['sql'] for query in context.captured_queries if '"users"' in query['sql']]
+
+
+class Test16ClaimsAuthentication:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_read_without_user_query(self, admin):
+        client = claims_client(admin)
+        client.get('/api/v1/categories/')
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/categories/')
+        assert response.status_code == 200
+        assert not users_queries(context), (
+            'Проверьте, что при чтении пользователь берется из claims токена без запроса к БД'
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/users/')
+        assert response.status_code == 200, (
+            'Проверьте, что роль администратора из claims токена дает доступ к `/api/v1/users/`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_write_uses_db_user(self, admin):
+        from reviews.models import Category
+
+        response = claims_client(admin).post('/api/v1/categories/', data={'name': 'Фильм', 'slug': 'films'})
+        assert response.status_code == 201
+        assert Category.objects.filter(slug='films').exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_role_change_revokes_token(self, admin_client, admin, user):
+        user_client = claims_client(user)
+        assert user_client.get('/api/v1/categories/').status_code == 200
+
+        response = admin_client.patch(f'/api/v1/users/{user.username}/', data={'role': 'moderator'})
+        assert response.status_code == 200
+        response = user_client.get('/api/v1/categories/')
+        assert response.status_code == 401, (
+            'Проверьте, что после смены роли ранее выданный токен отклоняется'
+        )
+
+        user.refresh_from_db()
+        assert claims_client(user).get('/api/v1/categories/').status_code == 200, (
+            'Проверьте, что токен, выданный после смены роли, принимается'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_profile_update_keeps_token(self, user):
+        user_client = claims_client(user)
+        response = user_client.patch('/api/v1/users/me/', data={'bio': 'Новая биография'})
+        assert response.status_code == 200
+        assert user_client.get('/api/v1/users/me/').status_code == 200, (
+            'Проверьте, что изменение профиля без смены роли не отзывает токен'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_role_cache_for_tokens_without_claims(self, admin_client, user):
+        from .common import auth_client
+
+        client = auth_client(user)
+        assert client.get('/api/v1/users/').status_code == 403
+        with CaptureQueriesContext(connection) as context:
+            client.get('/api/v1/categories/')
+        assert not users_queries(context), (
+            'Проверьте, что роль пользователя для запросов на чтение берется из кеша'
+        )
+
+        response = admin_client.patch(f'/api/v1/users/{user.username}/', data={'role': 'admin'})
+        assert response.status_code == 200
+        assert client.get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что смена роли сбрасывает кеш ролей'
+        )
+
+    def test_06_author_permission_uses_author_id(self):
+        from types import SimpleNamespace
+
+        from api.permissions import IsAuthorOrStaffOrReadOnlyPermission
+
+        class Review:
+            author_id = 5
+
+            @property
+            def author(self):
+                raise AssertionError('Проверьте, что права автора проверяются по `author_id`')
+
+        request = SimpleNamespace(method='PATCH', user=SimpleNamespace(pk=5))
+        assert IsAuthorOrStaffOrReadOnlyPermission().has_object_permission(request, None, Review())
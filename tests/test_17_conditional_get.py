@@ -0,0 +1,49 @@
+import pytest
+
+from .common import create_categories, create_titles
+
+
+class Test17ConditionalGet:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_list_not_modified(self, client, admin_client, django_assert_num_queries):
+        create_categories(admin_client)
+        response = client.get('/api/v1/categories/')
+        etag = response.get('ETag')
+        assert response.status_code == 200 and etag, (
+            'Проверьте, что список категорий отдается с заголовком `ETag`'
+        )
+        assert response.has_header('Last-Modified')
+
+        with django_assert_num_queries(0):
+            response = client.get('/api/v1/categories/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Проверьте, что при совпадении `If-None-Match` возвращается 304 без запросов к БД'
+        )
+        response = client.get('/api/v1/categories/',
+                              HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        assert response.status_code == 304, (
+            'Проверьте, что при неизмененном списке `If-Modified-Since` дает 304'
+        )
+        assert client.get('/api/v1/categories/?limit=1', HTTP_IF_NONE_MATCH=etag).status_code == 200, (
+            'Проверьте, что `ETag` зависит от параметров запроса'
+        )
+
+        admin_client.post('/api/v1/categories/', data={'name': 'Музыка', 'slug': 'music'})
+        response = client.get('/api/v1/categories/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and response['ETag'] != etag, (
+            'Проверьте, что после изменения категорий `ETag` меняется'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_title_detail_tracks_reviews(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        etag = client.get(url)['ETag']
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+        admin_client.post(f'{url}reviews/', data={'text': 'Отзыв', 'score': 7})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and response.json()['rating'] == 7, (
+            'Проверьте, что после нового отзыва произведение отдается с новым рейтингом'
+        )
@@ -0,0 +1,33 @@
+import pytest
+
+from .common import create_categories, create_genre
+
+
+class Test18ResponseCache:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('url, create', [
+        ('/api/v1/categories/', create_categories),
+        ('/api/v1/genres/', create_genre),
+    ])
+    def test_01_list_cached_until_write(self, client, admin_client, django_assert_num_queries,
+                                        url, create):
+        create(admin_client)
+        data = client.get(url).json()
+        with django_assert_num_queries(0):
+            cached = client.get(url)
+        assert cached.status_code == 200 and cached.json() == data, (
+            f'Проверьте, что повторный запрос `{url}` отдается из кеша без запросов к БД'
+        )
+        assert client.get(f'{url}?limit=1').json()['results'] != data['results'], (
+            'Проверьте, что кеш ответа учитывает параметры запроса'
+        )
+
+        admin_client.post(url, data={'name': 'Новая', 'slug': 'new-one'})
+        assert client.get(url).json()['count'] == data['count'] + 1, (
+            'Проверьте, что добавление объекта сбрасывает кеш списка'
+        )
+        admin_client.delete(f'{url}new-one/')
+        assert client.get(url).json() == data, (
+            'Проверьте, что удаление объекта сбрасывает кеш списка'
+        )
@@ -0,0 +1,73 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from .common import create_titles
+
+
+class Test19TitleDetailCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_detail_cache_hits(self, client, admin_client, django_assert_num_queries):
+        from api.cache import get_cache_stats
+
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        data = client.get(url).json()
+        with django_assert_num_queries(0):
+            response = client.get(url)
+        assert response.json() == data, (
+            'Проверьте, что повторный запрос произведения отдается из кеша без запросов к БД'
+        )
+        assert get_cache_stats('title-detail') == (1, 1)
+
+        out = StringIO()
+        call_command('cache_stats', '--reset', stdout=out)
+        assert 'попаданий 1, промахов 1' in out.getvalue()
+        assert get_cache_stats('title-detail') == (0, 0)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_detail_cache_invalidation(self, client, admin_client, django_assert_num_queries):
+        from reviews.models import Category, Genre
+
+        titles, categories, genres = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        other_url = f'/api/v1/titles/{titles[1]["id"]}/'
+        client.get(url)
+        client.get(other_url)
+
+        admin_client.patch(other_url, data={'name': 'Новое название'})
+        with django_assert_num_queries(0):
+            client.get(url)
+        assert client.get(other_url).json()['name'] == 'Новое название', (
+            'Проверьте, что изменение произведения сбрасывает его кеш'
+        )
+
+        admin_client.post(f'{url}reviews/', data={'text': 'Отзыв', 'score': 9})
+        assert client.get(url).json()['rating'] == 9, (
+            'Проверьте, что новый отзыв сбрасывает кеш произведения'
+        )
+
+        admin_client.patch(url, data={'genre': [genres[2]['slug']]})
+        assert [genre['slug'] for genre in client.get(url).json()['genre']] == [genres[2]['slug']], (
+            'Проверьте, что изменение жанров произведения сбрасывает его кеш'
+        )
+
+        genre = Genre.objects.get(slug=genres[2]['slug'])
+        genre.name = 'Переименованный жанр'
+        genre.save()
+        assert client.get(url).json()['genre'][0]['name'] == 'Переименованный жанр', (
+            'Проверьте, что изменение жанра сбрасывает кеш его произведений'
+        )
+
+        category = Category.objects.get(slug=titles[0]['category'])
+        category.name = 'Переименованная категория'
+        category.save()
+        assert client.get(url).json()['category']['name'] == 'Переименованная категория', (
+            'Проверьте, что изменение категории сбрасывает кеш ее произведений'
+        )
+        admin_client.delete(f'/api/v1/categories/{category.slug}/')
+        assert client.get(url).json()['category'] is None, (
+            'Проверьте, что удаление категории сбрасывает кеш ее произведений'
+        )
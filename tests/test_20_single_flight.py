@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from .common import create_titles
+
+
+class Test20SingleFlight:
+
+    def test_01_concurrent_misses_computed_once(self):
+        from api.cache import get_or_compute
+
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            get_or_compute('single-flight-test', compute, 60))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 1, (
+            'Проверьте, что при одновременных промахах значение считает только один обработчик'
+        )
+        assert results == ['value'] * 8
+
+    def test_02_stale_and_bounded_wait(self):
+        from django.core.cache import cache
+
+        from api.cache import get_or_compute
+
+        cache.add('lock:busy-key', 1, 60)
+        cache.set('stale-key', 'old')
+        assert get_or_compute('busy-key', lambda: 'new', 60, stale_key='stale-key') == 'old', (
+            'Проверьте, что во время пересчета отдается предыдущее значение'
+        )
+        started = time.monotonic()
+        assert get_or_compute('busy-key', lambda: 'new', 60, wait=0.2) == 'new', (
+            'Проверьте, что ожидание чужого пересчета ограничено по времени'
+        )
+        assert time.monotonic() - started < 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_title_list_cache(self, client, admin_client, django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        data = client.get('/api/v1/titles/').json()
+        with django_assert_num_queries(0):
+            assert client.get('/api/v1/titles/').json() == data, (
+                'Проверьте, что список произведений отдается из кеша'
+            )
+        admin_client.patch(f'/api/v1/titles/{titles[0]["id"]}/', data={'name': 'Другое название'})
+        names = [title['name'] for title in client.get('/api/v1/titles/').json()['results']]
+        assert 'Другое название' in names, (
+            'Проверьте, что изменение произведения сбрасывает кеш списка'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_stale_response_keeps_its_etag(self, client, admin_client):
+        from django.core.cache import cache
+
+        from api.cache import get_versioned_key
+        from api.mixins import get_cache_dependencies
+        from api.views import TitleViewSet
+
+        create_titles(admin_client)
+        url = '/api/v1/titles/?limit=1'
+        response = client.get(url)
+        old_etag, title = response['ETag'], response.json()['results'][0]
+        admin_client.patch(f'/api/v1/titles/{title["id"]}/', data={'name': 'Новое название'})
+
+        key = get_versioned_key('response', get_cache_dependencies(TitleViewSet()), url, 'json')
+        cache.add(f'lock:{key}', 1, 60)
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.json()['results'][0]['name'] == title['name']
+        assert response['ETag'] == old_etag, (
+            'Проверьте, что устаревший ответ отдается с ETag своей версии, а не текущим'
+        )
+        cache.delete(f'lock:{key}')
+        response = client.get(url, HTTP_IF_NONE_MATCH=old_etag)
+        assert response.status_code == 200 and response['ETag'] != old_etag, (
+            'Проверьте, что ETag устаревшего ответа не подтверждается ответом 304'
+        )
+        assert response.json()['results'][0]['name'] == 'Новое название'
@@ -0,0 +1,82 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_comments, create_titles
+
+
+class Test21SparseFieldsets:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_title_list_fields(self, client, admin_client):
+        create_titles(admin_client)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/titles/?fields=id,name')
+        assert response.status_code == 200
+        for title in response.json()['results']:
+            assert set(title) == {'id', 'name'}, (
+                'Проверьте, что `?fields=` оставляет в ответе только перечисленные поля'
+            )
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        assert 'genre' not in sql and 'description' not in sql and 'category' not in sql, (
+            'Проверьте, что `?fields=` сужает запрос к БД и пропускает жанры и категорию'
+        )
+
+        response = client.get('/api/v1/titles/?fields=name,rating,category,genre')
+        title = response.json()['results'][-1]
+        assert set(title) == {'name', 'rating', 'category', 'genre'}
+        assert title['category'] and title['genre'], (
+            'Проверьте, что запрошенные связанные поля отдаются целиком'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_title_detail_fields(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        assert set(client.get(f'{url}?fields=name').json()) == {'name'}
+        full = client.get(url).json()
+        assert {'name', 'genre', 'category', 'description'} <= set(full), (
+            'Проверьте, что ответ с `?fields=` не подменяет полный ответ в кеше'
+        )
+        assert client.get(f'{url}?fields=name,year').json() == {
+            'name': full['name'], 'year': full['year']}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_reviews_and_comments_fields(self, client, admin_client, admin):
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(f'/api/v1/titles/{titles[0]["id"]}/reviews/?fields=id,score')
+        assert all(set(review) == {'id', 'score'} for review in response.json()['results'])
+        assert not any('"users"' in query['sql'] for query in context.captured_queries), (
+            'Проверьте, что без поля `author` автор отзыва не загружается'
+        )
+
+        response = client.get(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/?fields=text,author')
+        assert response.json()['results'], 'Проверьте, что комментарии отдаются с `?fields=`'
+        assert all(set(comment) == {'text', 'author'} for comment in response.json()['results'])
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_unknown_field(self, client):
+        response = client.get('/api/v1/titles/?fields=id,unknown')
+        assert response.status_code == 400 and 'fields' in response.json(), (
+            'Проверьте, что неизвестное поле в `?fields=` дает ошибку 400'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_cursor_with_fields(self, client, admin_client, admin):
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        urls = (f'/api/v1/titles/{titles[0]["id"]}/reviews/?cursor=&fields=id,score',
+                f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/?cursor=&fields=id')
+        for url in urls:
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(f'{url}&limit=1')
+            assert response.json()['next'], 'Проверьте курсорную пагинацию с `?fields=`'
+            assert len(context.captured_queries) == 2
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(f'{url}&limit=3')
+            assert len(response.json()['results']) == 3
+            assert len(context.captured_queries) == 2, (
+                'Проверьте, что курсорная пагинация с `?fields=` не читает поля '
+                'упорядочивания отдельным запросом для каждого объекта'
+            )